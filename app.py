@@ -4,31 +4,103 @@ from datetime import datetime
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
-from flask_mail import Mail
+from sqlalchemy.exc import SQLAlchemyError
 from celery import Celery
 from config import Config
+from utils.db_engine import (
+    build_engine_options,
+    install_sqlite_pragmas,
+    sqlite_pragmas,
+)
+from utils.db_routing import (
+    REPLICA_BIND,
+    RoutingSession,
+    register_replica_routing,
+)
 
 # Ініціалізація розширень
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 login_manager = LoginManager()
-mail = Mail()
 celery = Celery(__name__)
 
 
-def create_app(config_class: type[Config] = Config) -> Flask:
-    """Функція створення Flask-додатку"""
+def create_app(
+    config_class: type[Config] = Config, lean: bool = False
+) -> Flask:
+    """Функція створення Flask-додатку
+
+    lean — без блюпринтів, веб-налаштувань і налаштувань з БД
+    (для Celery та скриптів).
+    Схема БД не перевіряється: таблиці створює `flask init-db`.
+    """
 
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    # Профіль рушія БД (пул і таймаути; для SQLite — WAL та PRAGMA)
+    app.config.setdefault(
+        "SQLALCHEMY_ENGINE_OPTIONS", build_engine_options(app.config)
+    )
+    replica_url = app.config.get("DATABASE_REPLICA_URL")
+    if replica_url:
+        # Репліка лише для читання: див. utils.db_routing
+        replica_options = build_engine_options(
+            {**app.config, "SQLALCHEMY_DATABASE_URI": replica_url}
+        )
+        app.config.setdefault("SQLALCHEMY_BINDS", {})[REPLICA_BIND] = {
+            "url": replica_url,
+            **replica_options,
+        }
+
     # Ініціалізація розширень з app
     db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            install_sqlite_pragmas(engine, sqlite_pragmas(app.config))
     login_manager.init_app(app)
-    mail.init_app(app)
 
     # Ініціалізація Celery
     celery.conf.update(app.config)
 
+    # Логування
+    if not app.debug:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setLevel(logging.INFO)
+        app.logger.addHandler(stream_handler)
+
+    # Закриття з'єднань з БД
+    @app.teardown_appcontext
+    def shutdown_session(exception=None):
+        db.session.remove()
+
+    if lean:
+        # Налаштування з БД завантажуються під час першого використання
+        # (SettingsService.refresh у get_app), без перевірки схеми тут
+        return app
+
+    # Налаштування, збережені через інтерфейс
+    from models import AppSetting
+    from services.settings_service import SettingsService
+
+    with app.app_context():
+        try:
+            # Таблиць ще немає (до init-db) — працюємо з .env
+            if db.inspect(db.engine).has_table(AppSetting.__tablename__):
+                SettingsService.load()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            app.logger.warning(
+                "Налаштування з БД не завантажено: %s", getattr(e, "orig", e)
+            )
+
+    if app.config["PROXY_FIX_X_FOR"]:
+        # request.remote_addr — адреса клієнта, а не проксі (ліміт входу)
+        from werkzeug.middleware.proxy_fix import ProxyFix
+
+        app.wsgi_app = ProxyFix(
+            app.wsgi_app, x_for=app.config["PROXY_FIX_X_FOR"]
+        )
+
     # Налаштування Flask-Login
     login_manager.login_view = "auth.login"
     login_manager.login_message = (
@@ -44,6 +116,8 @@ def create_app(config_class: type[Config] = Config) -> Flask:
     from routes.logs import logs_bp
     from routes.settings import settings_bp
     from routes.dashboard import dashboard_bp
+    from routes.groups import groups_bp
+    from routes.unsubscribe import unsubscribe_bp
 
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(employees_bp, url_prefix="/employees")
@@ -51,24 +125,32 @@ def create_app(config_class: type[Config] = Config) -> Flask:
     app.register_blueprint(logs_bp, url_prefix="/logs")
     app.register_blueprint(settings_bp, url_prefix="/settings")
     app.register_blueprint(dashboard_bp, url_prefix="/")
+    app.register_blueprint(groups_bp, url_prefix="/groups")
+    app.register_blueprint(unsubscribe_bp, url_prefix="/unsubscribe")
+
+    # GET-запити читають з репліки (якщо вона задана)
+    register_replica_routing(app)
 
     @app.context_processor
     def inject_now():
         return {"now": datetime.now()}
 
-    # Створення таблиць БД
-    with app.app_context():
-        db.create_all()
+    @app.before_request
+    def refresh_settings():
+        SettingsService.refresh()
 
-    # Логування
-    if not app.debug:
-        stream_handler = logging.StreamHandler()
-        stream_handler.setLevel(logging.INFO)
-        app.logger.addHandler(stream_handler)
+    return app
 
-    # Закриття з'єднань з БД
-    @app.teardown_appcontext
-    def shutdown_session(exception=None):
-        db.session.remove()
 
-    return app
+def mail_state(app: Flask, rebuild: bool = False):
+    """Стан Flask-Mail для app (flask_mail імпортується з першим листом)
+
+    Message бере з нього типового відправника, тому стан потрібен до
+    створення листа. rebuild — перечитати MAIL_* після зміни конфігу.
+    """
+    state = app.extensions.get("mail")
+    if state is None or rebuild:
+        from flask_mail import Mail
+
+        state = Mail().init_app(app)
+    return state
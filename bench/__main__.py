@@ -0,0 +1,18 @@
+"""Бенчмарки продуктивності: python -m bench <команда> (з кореня проєкту)"""
+
+import click
+
+from bench import db, fork, import_time
+
+
+@click.group()
+def cli():
+    """Заміри продуктивності (не потрібні для роботи додатку)"""
+
+
+cli.add_command(db.command)
+cli.add_command(fork.command)
+cli.add_command(import_time.command)
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,123 @@
+"""Конкуренція читачів і записувачів SQLite: типовий режим проти WAL"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List
+
+import click
+
+from bench.runner import compare
+
+MODES = {"journal": "rollback journal", "wal": "WAL + PRAGMA"}
+
+
+def run(
+    mode: str, readers: int, writers: int, seconds: float
+) -> Dict[str, Any]:
+    """Один прогін: потоки читають і пишуть у тимчасову БД seconds секунд"""
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import OperationalError
+
+    from config import Config
+    from utils.db_engine import install_sqlite_pragmas, sqlite_pragmas
+
+    pragmas = {}
+    if mode == "wal":
+        config = {key: getattr(Config, key) for key in dir(Config)}
+        pragmas = sqlite_pragmas({**config, "SQLITE_WAL": True})
+
+    path = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    engine = create_engine(f"sqlite:///{path}")
+    install_sqlite_pragmas(engine, pragmas)
+    with engine.begin() as connection:
+        connection.execute(
+            text("CREATE TABLE logs (id INTEGER PRIMARY KEY, body TEXT)")
+        )
+        connection.execute(
+            text("INSERT INTO logs (body) VALUES (:body)"),
+            [{"body": "x" * 200}] * 5000,
+        )
+
+    stats: Dict[str, Any] = {"read": [], "write": [], "errors": 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def worker(kind):
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                with engine.begin() as connection:
+                    if kind == "read":
+                        connection.execute(
+                            text(
+                                "SELECT count(*), max(length(body)) FROM logs"
+                            )
+                        ).all()
+                    else:
+                        connection.execute(
+                            text("INSERT INTO logs (body) VALUES (:body)"),
+                            [{"body": "y" * 200}] * 50,
+                        )
+            except OperationalError:
+                with lock:
+                    stats["errors"] += 1  # database is locked
+                continue
+            with lock:
+                stats[kind].append(time.perf_counter() - started)
+
+    threads = [
+        threading.Thread(target=worker, args=("read",)) for _ in range(readers)
+    ] + [
+        threading.Thread(target=worker, args=("write",))
+        for _ in range(writers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    return {
+        "reads": len(stats["read"]) / seconds,
+        "read_p95_ms": p95(stats["read"]),
+        "writes": len(stats["write"]) / seconds,
+        "write_p95_ms": p95(stats["write"]),
+        "errors": stats["errors"],
+    }
+
+
+def p95(values: List[float]) -> float:
+    if not values:
+        return 0.0
+    return sorted(values)[int(len(values) * 0.95)] * 1000
+
+
+@click.command("db")
+@click.option("--readers", default=4, help="Кількість потоків-читачів")
+@click.option("--writers", default=2, help="Кількість потоків-записувачів")
+@click.option("--seconds", default=5.0, help="Тривалість кожного прогону")
+def command(readers, writers, seconds):
+    """Конкуренція читачів і записувачів SQLite: типовий режим проти WAL"""
+    compare(
+        "bench.db",
+        MODES,
+        lambda stats: (
+            f"читань {stats['reads']:7.0f}/с "
+            f"(p95 {stats['read_p95_ms']:6.1f} мс), "
+            f"записів {stats['writes']:6.0f}/с "
+            f"(p95 {stats['write_p95_ms']:6.1f} мс), "
+            f"помилок блокування {stats['errors']}"
+        ),
+        readers,
+        writers,
+        seconds,
+    )
+
+
+if __name__ == "__main__":
+    mode, readers, writers, seconds = sys.argv[1:]
+    print(json.dumps(run(mode, int(readers), int(writers), float(seconds))))
@@ -0,0 +1,105 @@
+"""Пам'ять і час старту воркерів gunicorn: без preload, preload, freeze
+
+Воркери запускаються через fork, як у gunicorn, з хуками
+gunicorn.conf.py. Пам'ять — з /proc/<pid>/smaps_rollup (лише Linux).
+"""
+
+import gc
+import json
+import os
+import runpy
+import sys
+import time
+from typing import Any, Dict
+
+import click
+
+from bench.runner import compare
+
+MODES = {
+    "lazy": "без preload",
+    "preload": "preload",
+    "freeze": "preload + freeze",
+}
+
+
+def rollup(pid: int) -> Dict[str, int]:
+    """Підсумок пам'яті процесу, кБ"""
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        return {
+            key: int(value.split()[0])
+            for key, _, value in (line.partition(":") for line in f)
+            if value.strip().endswith("kB")
+        }
+
+
+def run(mode: str, workers: int) -> Dict[str, Any]:
+    """Один прогін: master і workers воркерів до першої обробки запитів"""
+    started = time.perf_counter()
+    hooks = runpy.run_path("gunicorn.conf.py")
+    if mode != "lazy":
+        import wsgi  # noqa: F401 — preload у master
+    if mode == "freeze":
+        hooks["when_ready"](None)
+
+    ready_r, ready_w = os.pipe()
+    stop_r, stop_w = os.pipe()
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(stop_w)
+            import wsgi
+
+            if mode != "lazy":
+                hooks["post_fork"](None, None)
+            client = wsgi.app.test_client()
+            for _ in range(20):
+                client.get("/auth/login")
+            gc.collect()  # повний обхід, як у воркері під навантаженням
+            os.write(ready_w, b".")
+            os.read(stop_r, 1)  # чекати, доки master зніме заміри
+            os._exit(0)
+        pids.append(pid)
+    os.close(stop_r)
+    for _ in pids:
+        os.read(ready_r, 1)
+    boot = time.perf_counter() - started
+
+    workers_mem = [rollup(pid) for pid in pids]
+    master = rollup(os.getpid())
+    os.close(stop_w)
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+    return {
+        "boot_ms": boot * 1000,
+        "pss_kb": master["Pss"] + sum(item["Pss"] for item in workers_mem),
+        "private_kb": sum(item["Private_Dirty"] for item in workers_mem)
+        / len(workers_mem),
+    }
+
+
+@click.command("fork")
+@click.option("--workers", default=3, help="Кількість воркерів")
+def command(workers):
+    """Пам'ять і час старту воркерів: без preload, preload, preload + freeze"""
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        click.echo("❌ Потрібен Linux (/proc/<pid>/smaps_rollup)")
+        sys.exit(1)
+
+    compare(
+        "bench.fork",
+        MODES,
+        lambda stats: (
+            f"старт {stats['boot_ms']:6.0f} мс, "
+            f"PSS master + воркери {stats['pss_kb'] / 1024:6.1f} МБ, "
+            f"власна пам'ять воркера {stats['private_kb'] / 1024:5.1f} МБ"
+        ),
+        workers,
+    )
+
+
+if __name__ == "__main__":
+    mode, workers = sys.argv[1:]
+    print(json.dumps(run(mode, int(workers))))
@@ -0,0 +1,59 @@
+"""Час холодного імпорту (-X importtime) проти бюджету"""
+
+import sys
+
+import click
+
+from bench.runner import run_python
+
+# Модулі, які не мають завантажуватися під час старту
+DEFERRED_MODULES = ("pandas", "openpyxl", "flask_mail")
+
+
+@click.command("import-time")
+@click.option("--module", default="wsgi", help="Модуль для імпорту")
+@click.option(
+    "--budget-ms",
+    type=int,
+    default=None,
+    help="Бюджет холодного старту, мс (типово IMPORT_TIME_BUDGET_MS)",
+)
+@click.option("--top", default=10, help="Скільки найдовших імпортів показати")
+def command(module, budget_ms, top):
+    """Перевірити час холодного імпорту (-X importtime) проти бюджету"""
+    if budget_ms is None:
+        from config import Config
+
+        budget_ms = Config.IMPORT_TIME_BUDGET_MS
+    result = run_python(["-c", f"import {module}"], flags=("-X", "importtime"))
+
+    # "import time: self [us] | cumulative | imported package"
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imports.append((name[1:].rstrip(), int(cumulative)))
+
+    total = next(us for name, us in imports if name.strip() == module)
+    loaded = {name.strip().split(".")[0] for name, _ in imports}
+    deferred = [name for name in DEFERRED_MODULES if name in loaded]
+
+    click.echo(
+        f"Імпорт {module}: {total / 1000:.0f} мс (бюджет {budget_ms} мс)"
+    )
+    # Прямі залежності верхнього рівня (відступ у два пробіли)
+    direct = [
+        (name.strip(), us)
+        for name, us in imports
+        if name.startswith("  ") and not name.startswith("   ")
+    ]
+    for name, us in sorted(direct, key=lambda item: -item[1])[:top]:
+        click.echo(f"  {us / 1000:8.1f} мс  {name}")
+
+    if deferred:
+        click.echo(f"❌ Під час старту імпортовано: {', '.join(deferred)}")
+    if total / 1000 > budget_ms:
+        click.echo("❌ Бюджет часу старту перевищено")
+    if deferred or total / 1000 > budget_ms:
+        sys.exit(1)
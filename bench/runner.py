@@ -0,0 +1,48 @@
+"""Спільний запуск бенчмарків: кожен замір — в окремому інтерпретаторі"""
+
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Callable, Dict, Sequence
+
+import click
+
+# Корінь проєкту: звідси імпортуються wsgi, config тощо
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(
+    args: Sequence[str], flags: Sequence[str] = ()
+) -> subprocess.CompletedProcess:
+    """Запустити python з аргументами; завершити CLI, якщо процес впав"""
+    result = subprocess.run(
+        [sys.executable, *flags, *args],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+    )
+    if result.returncode != 0:
+        click.echo(result.stderr[-2000:])
+        sys.exit(result.returncode)
+    return result
+
+
+def probe(module: str, *args: Any) -> Dict[str, Any]:
+    """Запустити probe-модуль (python -m) і прочитати його JSON-звіт"""
+    result = run_python(["-m", module, *map(str, args)])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def compare(
+    module: str,
+    modes: Dict[str, str],
+    describe: Callable[[Dict[str, Any]], str],
+    *args: Any,
+) -> Dict[str, Dict[str, Any]]:
+    """Прогнати probe-модуль у кожному режимі та вивести рядок на режим"""
+    results = {}
+    for mode, name in modes.items():
+        results[mode] = probe(module, mode, *args)
+        click.echo(f"{name:>16}: {describe(results[mode])}")
+    return results
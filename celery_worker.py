@@ -1,22 +1,124 @@
+from celery.beat import PersistentScheduler
 from celery.schedules import crontab
+from celery.signals import beat_init
+from kombu import Queue
 
-from app import create_app, celery
+from app import create_app, celery, db
+from services.settings_service import SettingsService
 
 from tasks import celery_tasks  # імпортуємо, щоб зареєструвати задачі
 
 # Ініціалізація Flask app та контекст
-flask_app = create_app()
+flask_app = create_app(lean=True)
 flask_app.app_context().push()
+# Розклад beat будується з налаштувань БД (lean-додаток їх не читає)
+SettingsService.refresh()
+db.session.remove()
 
-# Налаштування розкладу для celery beat
-celery.conf.beat_schedule = {
-    "daily-birthday-check": {
-        "task": "tasks.celery_tasks.send_daily_birthday_notifications",
-        "schedule": crontab(
-            minute=0, hour=flask_app.config.get("EMAIL_SEND_TIME")
-        ),  # час запуску
+# Черги: термінові задачі не чекають за масовими
+celery.conf.task_queues = (
+    Queue("interactive"),  # дії користувача в інтерфейсі
+    Queue("daily"),  # щоденні запуски та підготовка листів
+    Queue("retry"),  # доставка outbox та повтори
+    Queue("import"),  # масова обробка (скринька відмов)
+)
+celery.conf.task_default_queue = "retry"
+celery.conf.task_routes = {
+    "tasks.celery_tasks.send_daily_birthday_notifications": {
+        "queue": "daily",
+        "priority": 3,
+    },
+    "tasks.celery_tasks.plan_timezone_notifications": {
+        "queue": "daily",
+        "priority": 3,
+    },
+    "tasks.celery_tasks.catch_up_daily_runs": {"queue": "daily", "priority": 3},
+    "tasks.celery_tasks.prepare_daily_birthday_notifications": {
+        "queue": "daily",
+        "priority": 5,
     },
+    "tasks.celery_tasks.deliver_outbox": {"queue": "retry", "priority": 6},
+    "tasks.celery_tasks.retry_failed_email": {"queue": "retry", "priority": 6},
+    "tasks.celery_tasks.process_bounces": {"queue": "import", "priority": 9},
+}
+
+# Пріоритети в Redis: 0 — найвищий, 9 — найнижчий
+celery.conf.task_default_priority = 5
+celery.conf.broker_transport_options = {
+    "priority_steps": list(range(10)),
+    "sep": ":",
+    "queue_order_strategy": "priority",
 }
+# Воркер не бере наперед задачі, що можуть чекати за довгою
+celery.conf.worker_prefetch_multiplier = 1
+
+
+def build_beat_schedule(config) -> dict:
+    """Розклад celery beat з поточних налаштувань"""
+    schedule = {
+        "daily-birthday-check": {
+            "task": "tasks.celery_tasks.send_daily_birthday_notifications",
+            "schedule": crontab(
+                minute=0, hour=config.get("EMAIL_SEND_TIME")
+            ),  # час запуску
+        },
+        "daily-birthday-prepare": {
+            "task": "tasks.celery_tasks.prepare_daily_birthday_notifications",
+            "schedule": crontab(
+                minute=0, hour=config.get("EMAIL_PREPARE_TIME")
+            ),  # підготовка листів напередодні
+        },
+        "outbox-delivery": {
+            "task": "tasks.celery_tasks.deliver_outbox",
+            "schedule": crontab(),  # щохвилини: повтори та залишки черги
+        },
+    }
+
+    if config.get("EMAIL_PER_TIMEZONE"):
+        # Щогодини обробляються лише зони, де настала година розсилки
+        del schedule["daily-birthday-check"]
+        del schedule["daily-birthday-prepare"]
+        schedule["timezone-planner"] = {
+            "task": "tasks.celery_tasks.plan_timezone_notifications",
+            "schedule": crontab(minute=0),
+        }
+
+    if config.get("BOUNCE_MAILBOX_PATH"):
+        schedule["bounce-processing"] = {
+            "task": "tasks.celery_tasks.process_bounces",
+            "schedule": crontab(minute=30),  # щогодини
+        }
+    return schedule
+
+
+class SettingsAwareScheduler(PersistentScheduler):
+    """Планувальник beat, що перебудовує розклад після зміни налаштувань"""
+
+    def tick(self, *args, **kwargs):
+        try:
+            changed = SettingsService.refresh()
+        finally:
+            db.session.remove()  # не тримати транзакцію між тиками
+        if changed:
+            self.merge_inplace(build_beat_schedule(flask_app.config))
+            self.install_default_entries(self.schedule)
+        return super().tick(*args, **kwargs)
+
+
+# Налаштування розкладу для celery beat
+celery.conf.beat_schedule = build_beat_schedule(flask_app.config)
+celery.conf.beat_scheduler = SettingsAwareScheduler
+# Не спати довше за інтервал перевірки налаштувань
+celery.conf.beat_max_loop_interval = flask_app.config["SETTINGS_CHECK_INTERVAL"]
 
 # Налаштування часової зони
 celery.conf.timezone = flask_app.config.get("TIMEZONE", "UTC")
+
+
+@beat_init.connect
+def catch_up_on_startup(**kwargs):
+    """Після простою beat догнати пропущені щоденні запуски
+
+    Лише beat: кожен воркер під час старту ставив би ще одну задачу.
+    """
+    celery_tasks.catch_up_daily_runs.delay()
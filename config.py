@@ -18,6 +18,22 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Репліка для читання (дашборд, журнали, статистика); порожньо — вимкнено
+    DATABASE_REPLICA_URL = env.str("DATABASE_REPLICA_URL", None)
+    # Скільки секунд після запису клієнт читає з primary
+    DB_REPLICA_STICKY_SECONDS = env.int("DB_REPLICA_STICKY_SECONDS", 5)
+
+    # Профіль рушія БД. PostgreSQL: пул, перевірка з'єднань, таймаут запитів
+    DB_POOL_SIZE = env.int("DB_POOL_SIZE", 10)
+    DB_MAX_OVERFLOW = env.int("DB_MAX_OVERFLOW", 20)
+    DB_POOL_TIMEOUT = env.int("DB_POOL_TIMEOUT", 30)
+    DB_POOL_RECYCLE = env.int("DB_POOL_RECYCLE", 1800)
+    DB_STATEMENT_TIMEOUT_MS = env.int("DB_STATEMENT_TIMEOUT_MS", 30000)
+    # SQLite: WAL (читачі не чекають записувача), таймаут блокування, mmap
+    SQLITE_WAL = env.bool("SQLITE_WAL", True)
+    SQLITE_BUSY_TIMEOUT_MS = env.int("SQLITE_BUSY_TIMEOUT_MS", 5000)
+    SQLITE_MMAP_SIZE = env.int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+
     # Налаштування пошти
     MAIL_SERVER = env.str("MAIL_SERVER")
     MAIL_PORT = env.int("MAIL_PORT") or 587
@@ -35,16 +51,84 @@ class Config:
         env.str("CELERY_RESULT_BACKEND") or "redis://localhost:6379/0"
     )
 
+    # Redis для спільного стану між процесами (ліміти, блокування)
+    REDIS_URL = env.str("REDIS_URL", None) or broker_url
+
+    # Як часто процеси перевіряють версію налаштувань з БД (секунди)
+    SETTINGS_CHECK_INTERVAL = env.int("SETTINGS_CHECK_INTERVAL", 30)
+
+    # Оренда замка одиночних задач Celery (секунди, продовжується фоново)
+    TASK_LOCK_TTL = env.int("TASK_LOCK_TTL", 300)
+
+    # Бюджет холодного імпорту wsgi для check-import-time (мс)
+    IMPORT_TIME_BUDGET_MS = env.int("IMPORT_TIME_BUDGET_MS", 1500)
+
     # Часова зона
     TIMEZONE = env.str("TIMEZONE") or "Europe/Kyiv"
 
     # Налаштування Email відправлення
     EMAIL_SEND_TIME = env.int("EMAIL_SEND_TIME")
+    # Догін пропущених щоденних запусків: скільки днів назад та оренда (сек.)
+    DAILY_RUN_GRACE_DAYS = env.int("DAILY_RUN_GRACE_DAYS", 3)
+    DAILY_RUN_LEASE_SECONDS = env.int("DAILY_RUN_LEASE_SECONDS", 3600)
+    # Розсилка за часовими зонами співробітників (погодинний планувальник)
+    EMAIL_PER_TIMEZONE = env.bool("EMAIL_PER_TIMEZONE", False)
+    # Вікно доставки після EMAIL_SEND_TIME (хвилин, 0 — усі листи одразу)
+    # та розподіл листів у ньому: even — рівномірно, weighted — за отримувачами
+    EMAIL_SEND_WINDOW_MINUTES = env.int("EMAIL_SEND_WINDOW_MINUTES", 0)
+    EMAIL_SEND_WINDOW_MODE = env.str("EMAIL_SEND_WINDOW_MODE", "even")
+    # Дайджест: один лист на отримувача про всі ДН дня
+    EMAIL_DIGEST_MODE = env.bool("EMAIL_DIGEST_MODE", False)
+    # Година підготовки листів на наступний день (напередодні)
+    EMAIL_PREPARE_TIME = env.int("EMAIL_PREPARE_TIME", 20)
+    # Персональне посилання відписки в кожному листі
+    EMAIL_UNSUBSCRIBE_LINKS = env.bool("EMAIL_UNSUBSCRIBE_LINKS", False)
+    # Публічна адреса додатку (для посилань у листах)
+    APP_BASE_URL = env.str("APP_BASE_URL", "http://localhost:5000")
     RETRY_ATTEMPTS = env.int("RETRY_ATTEMPTS")
     RETRY_DELAY = env.int("RETRY_DELAY")
 
+    # Обробка відмов доставки: скринька mbox/Maildir та поріг м'яких відмов
+    BOUNCE_MAILBOX_PATH = env.str("BOUNCE_MAILBOX_PATH", None)
+    BOUNCE_SOFT_THRESHOLD = env.int("BOUNCE_SOFT_THRESHOLD", 3)
+
+    # Налаштування outbox (черги доставки)
+    OUTBOX_BATCH_SIZE = env.int("OUTBOX_BATCH_SIZE", 50)
+    OUTBOX_LEASE_SECONDS = env.int("OUTBOX_LEASE_SECONDS", 300)
+
+    # Квоти SMTP релею (0 — без обмеження)
+    SMTP_MAX_MESSAGES_PER_MINUTE = env.int("SMTP_MAX_MESSAGES_PER_MINUTE", 0)
+    SMTP_MAX_MESSAGES_PER_HOUR = env.int("SMTP_MAX_MESSAGES_PER_HOUR", 0)
+    SMTP_MAX_RECIPIENTS_PER_MINUTE = env.int(
+        "SMTP_MAX_RECIPIENTS_PER_MINUTE", 0
+    )
+    SMTP_MAX_RECIPIENTS_PER_HOUR = env.int("SMTP_MAX_RECIPIENTS_PER_HOUR", 0)
+    # Скільки секунд чекати на квоту перед відкладенням листа
+    SMTP_RATE_MAX_WAIT = env.int("SMTP_RATE_MAX_WAIT", 30)
+
+    # Пул SMTP провайдерів (JSON-список), напр.:
+    # [{"name": "a", "server": "smtp.a.com", "port": 587, "use_tls": true,
+    #   "username": "...", "password": "...", "weight": 2,
+    #   "max_messages_per_hour": 500}]
+    # Порожній — один провайдер з MAIL_* та квотами SMTP_MAX_*
+    SMTP_PROVIDERS = env.json("SMTP_PROVIDERS", [])
+
+    # Запобіжник SMTP: кількість помилок поспіль та пауза (секунди)
+    SMTP_BREAKER_THRESHOLD = env.int("SMTP_BREAKER_THRESHOLD", 5)
+    SMTP_BREAKER_COOLDOWN = env.int("SMTP_BREAKER_COOLDOWN", 60)
+
     # Налаштування сесій
     SESSION_COOKIE_HTTPONLY = True  # Заборонити доступ до кук через JavaScript
     SESSION_COOKIE_SECURE = False  # Передавати куки тільки через HTTPS
     REMEMBER_COOKIE_HTTPONLY = True
     REMEMBER_COOKIE_SECURE = True
+    # Скільки секунд кешувати адміністратора сесії (0 — без кешу).
+    # Зміни з інших процесів і масові Query.update()/delete() по admins
+    # (деактивація, зміна ролі) діють лише після закінчення TTL
+    AUTH_CACHE_TTL = env.int("AUTH_CACHE_TTL", 10)
+    # Ліміт спроб входу за ковзне вікно (0 — без обмеження)
+    LOGIN_WINDOW_SECONDS = env.int("LOGIN_WINDOW_SECONDS", 300)
+    LOGIN_MAX_PER_IP = env.int("LOGIN_MAX_PER_IP", 20)
+    LOGIN_MAX_PER_USERNAME = env.int("LOGIN_MAX_PER_USERNAME", 10)
+    # Кількість проксі перед додатком (nginx тощо): IP клієнта з X-Forwarded-For
+    PROXY_FIX_X_FOR = env.int("PROXY_FIX_X_FOR", 0)
@@ -0,0 +1,60 @@
+"""Налаштування gunicorn для продакшену (gunicorn -c gunicorn.conf.py wsgi:app)."""
+
+import gc
+import multiprocessing
+
+from environs import Env
+
+env = Env()
+env.read_env()
+
+bind = env.str("GUNICORN_BIND", "0.0.0.0:5000")
+workers = env.int("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1)
+
+# sync — класичні процеси; gthread — потоки в кожному процесі (для
+# ендпоінтів, що чекають на SMTP/Redis/БД); gevent — зелені потоки
+# (потрібен pip install gevent)
+worker_class = env.str("GUNICORN_WORKER_CLASS", "gthread")
+threads = env.int("GUNICORN_THREADS", 4)
+worker_connections = env.int("GUNICORN_WORKER_CONNECTIONS", 1000)
+
+timeout = env.int("GUNICORN_TIMEOUT", 30)
+graceful_timeout = env.int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+keepalive = env.int("GUNICORN_KEEPALIVE", 5)
+# Перезапуск воркерів проти накопичення пам'яті
+max_requests = env.int("GUNICORN_MAX_REQUESTS", 1000)
+max_requests_jitter = env.int("GUNICORN_MAX_REQUESTS_JITTER", 100)
+
+# Додаток імпортується один раз у master, воркери отримують його
+# через fork (copy-on-write): швидший старт і менше пам'яті на воркер
+preload_app = env.bool("GUNICORN_PRELOAD", True)
+
+accesslog = "-"
+errorlog = "-"
+loglevel = env.str("GUNICORN_LOG_LEVEL", "info")
+
+
+def when_ready(server):
+    """Один раз після завантаження додатку: заморозити об'єкти master
+
+    Заморожені об'єкти збирач сміття не обходить, тому він не торкається
+    їхніх сторінок пам'яті у воркері і copy-on-write їх не копіює.
+    Не в pre_fork: перезапуск воркера (max_requests) щоразу переносив би
+    нові об'єкти master у постійне покоління.
+    """
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Після fork: не використовувати з'єднання з БД, відкриті в master"""
+    if not preload_app:
+        return
+
+    from app import db
+    from wsgi import app
+
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False: з'єднання належать master, лише забуваємо їх
+            engine.dispose(close=False)
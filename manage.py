@@ -6,6 +6,7 @@ import click
 from flask.cli import with_appcontext
 from app import create_app, db
 from models import Admin, AdminRole, Employee
+from services.bounce_service import BounceService
 
 
 def create_manage_app():
@@ -19,9 +20,13 @@ app = create_manage_app()
 @app.cli.command()
 @with_appcontext
 def init_db():
-    """Initialize the database."""
+    """Initialize the database (run after every upgrade)."""
     click.echo("Ініціалізація бази даних ...")
+    existing = set(db.inspect(db.engine).get_table_names())
     db.create_all()
+    created = sorted(set(db.metadata.tables) - existing)
+    if created:
+        click.echo(f"Створено таблиці: {', '.join(created)}")
     click.echo("База даних успішно ініціалізована!")
 
 
@@ -96,3 +101,21 @@ def add_employee(first_name, last_name, email, birth_date):
     db.session.add(employee)
     db.session.commit()
     print(f"Співробітник {employee.full_name} успішно доданий!")
+
+
+@app.cli.command("process-bounces")
+@with_appcontext
+@click.argument("path", required=False)
+def process_bounces(path):
+    """Обробити листи-відмови з mbox або Maildir"""
+    path = path or app.config["BOUNCE_MAILBOX_PATH"]
+    if not path:
+        click.echo("❌ Вкажіть шлях до скриньки або BOUNCE_MAILBOX_PATH.")
+        return
+
+    stats = BounceService.process_mailbox(path)
+    click.echo(
+        f"Листів: {stats['messages']}, відмов: {stats['bounces']} "
+        f"(постійних: {stats['hard']}, тимчасових: {stats['soft']}), "
+        f"нових виключених адрес: {stats['suppressed']}"
+    )
@@ -4,6 +4,7 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 from sqlalchemy import Enum
 import enum
+import json
 
 
 class AdminRole(enum.Enum):
@@ -11,6 +12,11 @@ class AdminRole(enum.Enum):
     SUPER_ADMIN = "super_admin"
 
 
+class GroupScope(enum.Enum):
+    MEMBERS = "members"  # повідомлення лише учасникам групи
+    COMPANY = "company"  # повідомлення всій компанії
+
+
 class Admin(UserMixin, db.Model):
     __tablename__ = "admins"
 
@@ -35,6 +41,46 @@ class Admin(UserMixin, db.Model):
         return f"<Admin {self.username}>"
 
 
+# Членство співробітників у групах (many-to-many)
+employee_groups = db.Table(
+    "employee_groups",
+    db.Column(
+        "employee_id",
+        db.Integer,
+        db.ForeignKey("employees.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    db.Column(
+        "group_id",
+        db.Integer,
+        db.ForeignKey("groups.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    # PK (employee_id, group_id) покриває пошук груп співробітника,
+    # цей індекс — пошук учасників групи
+    db.Index("ix_employee_groups_group_id", "group_id", "employee_id"),
+)
+
+
+class Group(db.Model):
+    __tablename__ = "groups"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    notification_scope = db.Column(
+        Enum(GroupScope), nullable=False, default=GroupScope.MEMBERS
+    )
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Зв'язки
+    members = db.relationship(
+        "Employee", secondary=employee_groups, back_populates="groups"
+    )
+
+    def __repr__(self):
+        return f"<Group {self.name}>"
+
+
 class Employee(db.Model):
     __tablename__ = "employees"
 
@@ -47,6 +93,15 @@ class Employee(db.Model):
 
     # Зв'язки
     email_logs = db.relationship("EmailLog", backref="employee", lazy=True)
+    groups = db.relationship(
+        "Group", secondary=employee_groups, back_populates="members"
+    )
+    opt_outs = db.relationship(
+        "NotificationOptOut", cascade="all, delete-orphan", lazy=True
+    )
+    schedule = db.relationship(
+        "EmployeeSchedule", uselist=False, cascade="all, delete-orphan"
+    )
 
     @property
     def full_name(self):
@@ -56,6 +111,53 @@ class Employee(db.Model):
         return f"<Employee {self.full_name}>"
 
 
+class EmployeeSchedule(db.Model):
+    """Часова зона співробітника та дата наступного нагадування про його ДН"""
+
+    __tablename__ = "employee_schedules"
+    __table_args__ = (
+        db.Index(
+            "ix_employee_schedules_timezone_date", "timezone", "notification_date"
+        ),
+    )
+
+    employee_id = db.Column(
+        db.Integer,
+        db.ForeignKey("employees.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    timezone = db.Column(db.String(64))  # None — часова зона з конфігу
+    notification_date = db.Column(db.Date, nullable=False)
+
+    def __repr__(self):
+        return f"<EmployeeSchedule {self.employee_id}: {self.notification_date}>"
+
+
+class NotificationOptOut(db.Model):
+    """Відмова співробітника від розсилки (group_id=None — від усієї)"""
+
+    __tablename__ = "notification_opt_outs"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "employee_id", "group_id", name="uq_opt_out_employee_group"
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    employee_id = db.Column(
+        db.Integer,
+        db.ForeignKey("employees.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    group_id = db.Column(
+        db.Integer, db.ForeignKey("groups.id", ondelete="CASCADE")
+    )
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<NotificationOptOut {self.employee_id}:{self.group_id}>"
+
+
 class EmailTemplate(db.Model):
     __tablename__ = "email_templates"
 
@@ -78,20 +180,154 @@ class EmailLog(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(
-        db.Integer, db.ForeignKey("employees.id"), nullable=False
+        db.Integer,
+        db.ForeignKey("employees.id", ondelete="CASCADE"),
+        nullable=False,
     )
     template_id = db.Column(
         db.Integer, db.ForeignKey("email_templates.id"), nullable=False
     )
     sent_date = db.Column(db.DateTime, default=datetime.utcnow)
     recipients_count = db.Column(db.Integer, nullable=False)
-    status = db.Column(db.String(50), default="sent")  # sent, failed, retry
+    status = db.Column(db.String(50), default="sent")  # sent, partial, failed, retry
     error_message = db.Column(db.Text)
 
     def __repr__(self):
         return f"<EmailLog {self.id}>"
 
 
+class SuppressedAddress(db.Model):
+    """Адреса з відмовами доставки (bounce); suppressed — виключена з розсилки"""
+
+    __tablename__ = "suppressed_addresses"
+
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    # hard — постійна відмова (5.x.x), soft — тимчасова (4.x.x)
+    bounce_type = db.Column(db.String(10), nullable=False)
+    status_code = db.Column(db.String(20))
+    diagnostic = db.Column(db.Text)
+    soft_count = db.Column(db.Integer, default=0, nullable=False)
+    suppressed = db.Column(db.Boolean, default=False, nullable=False)
+    first_bounced_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_bounced_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SuppressedAddress {self.email}>"
+
+
+class OutboxMessage(db.Model):
+    """Лист у черзі на доставку (серіалізований MIME)"""
+
+    __tablename__ = "outbox"
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Ключ ідемпотентності: дата + іменинники, яких стосується лист
+    dedupe_key = db.Column(db.String(255), unique=True, nullable=False)
+    employee_id = db.Column(
+        db.Integer,
+        db.ForeignKey("employees.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    # Дайджест: JSON список усіх іменинників у листі (інакше None)
+    employee_ids = db.Column(db.Text)
+    template_id = db.Column(
+        db.Integer, db.ForeignKey("email_templates.id"), nullable=False
+    )
+    send_date = db.Column(db.Date, nullable=False, index=True)
+    recipients = db.Column(db.Text, nullable=False)  # JSON список email
+    recipients_count = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    status = db.Column(
+        db.String(50), default="pending", index=True
+    )  # pending, processing, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    available_at = db.Column(db.DateTime, index=True)  # не раніше (UTC)
+    claim_token = db.Column(db.String(32), index=True)
+    locked_until = db.Column(db.DateTime)  # оренда обробника (UTC)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    error_message = db.Column(db.Text)
+
+    # Зв'язки
+    employee = db.relationship("Employee")
+
+    @property
+    def covered_employee_ids(self):
+        """Іменинники, яких стосується лист"""
+        if self.employee_ids:
+            return json.loads(self.employee_ids)
+        return [self.employee_id]
+
+    def __repr__(self):
+        return f"<OutboxMessage {self.id}>"
+
+
+class DailyRun(db.Model):
+    """Щоденний запуск розсилки: не більше одного на дату та область"""
+
+    __tablename__ = "daily_runs"
+    __table_args__ = (
+        db.UniqueConstraint("run_date", "scope", name="uq_daily_runs_date_scope"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    run_date = db.Column(db.Date, nullable=False)
+    # all — усі співробітники, інакше часова зона (default — з конфігу)
+    scope = db.Column(db.String(64), nullable=False, default="all")
+    status = db.Column(db.String(20), nullable=False)  # running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=1)
+    queued = db.Column(db.Integer)
+    claimed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Fencing token замка задачі, що захопила запуск (None — без замка)
+    fence_token = db.Column(db.BigInteger)
+    finished_at = db.Column(db.DateTime)
+    error_message = db.Column(db.Text)
+
+    def __repr__(self):
+        return f"<DailyRun {self.run_date} {self.scope}: {self.status}>"
+
+
+class EmailDelivery(db.Model):
+    """Результат доставки листа конкретному отримувачу (одна спроба)"""
+
+    __tablename__ = "email_deliveries"
+
+    id = db.Column(db.Integer, primary_key=True)
+    outbox_id = db.Column(
+        db.Integer,
+        db.ForeignKey("outbox.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    email = db.Column(db.String(120), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False)  # sent, refused, failed
+    smtp_code = db.Column(db.Integer)
+    smtp_response = db.Column(db.Text)
+    attempt = db.Column(db.Integer, nullable=False, default=1)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<EmailDelivery {self.email}: {self.status}>"
+
+
+class AppSetting(db.Model):
+    """Налаштування, змінене через інтерфейс (перекриває значення з .env)"""
+
+    __tablename__ = "app_settings"
+
+    key = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.Text, nullable=False)  # JSON
+    # Версія збереження: max(version) — версія всіх налаштувань
+    version = db.Column(db.Integer, nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<AppSetting {self.key} v{self.version}>"
+
+
 @login_manager.user_loader
 def load_user(user_id):
-    return Admin.query.get(int(user_id))
+    from services.admin_cache import AdminCache
+
+    return AdminCache.get(int(user_id))
@@ -12,6 +12,8 @@ from flask import (
 from flask_login import login_user, logout_user, login_required, current_user
 from models import Admin, AdminRole
 from app import db
+from services.admin_cache import AdminCache
+from services.login_throttle import LoginThrottle
 from utils.validators import Validators
 import re
 
@@ -39,9 +41,24 @@ def login():
         if not username or not password:
             return jsonify({"error": "Всі поля обов'язкові"}), 400
 
+        # Ліміт спроб — до дорогої перевірки хешу пароля
+        retry_after = LoginThrottle.hit(request.remote_addr or "", username)
+        if retry_after:
+            response = jsonify(
+                {
+                    "error": "Забагато спроб входу. Спробуйте через "
+                    f"{retry_after:.0f} с",
+                    "retry_after": retry_after,
+                }
+            )
+            response.headers["Retry-After"] = str(retry_after)
+            return response, 429
+
         admin = Admin.query.filter_by(username=username).first()
 
         if admin and admin.check_password(password):
+            LoginThrottle.record("succeeded")
+            LoginThrottle.reset_username(username)
             login_user(admin, remember=True)
             return (
                 jsonify(
@@ -57,6 +74,7 @@ def login():
                 200,
             )
         else:
+            LoginThrottle.record("failed")
             return jsonify({"error": "Невірні дані для входу"}), 401
 
     except Exception as e:
@@ -122,6 +140,8 @@ def change_password():
         # Змінити пароль
         current_user.set_password(new_password)
         db.session.commit()
+        # Явно, не покладаючись лише на ORM-події flush
+        AdminCache.invalidate(current_user.id)
 
         return jsonify({"message": "Пароль успішно змінено"}), 200
 
@@ -295,6 +315,7 @@ def delete_user(user_id):
 
         db.session.delete(user)
         db.session.commit()
+        AdminCache.invalidate(user_id)
 
         return jsonify({"message": "Користувача успішно видалено"}), 200
 
@@ -306,6 +327,36 @@ def delete_user(user_id):
         )
 
 
+@auth_bp.route("/api/login-throttle", methods=["GET"])
+@login_required
+def login_throttle_stats():
+    """API: Лічильники спроб входу та обмежених запитів"""
+    try:
+        if not current_user.has_role(AdminRole.SUPER_ADMIN):
+            return jsonify({"error": "Недостатньо прав"}), 403
+
+        config = current_app.config
+        return (
+            jsonify(
+                {
+                    "counters": LoginThrottle.stats(),
+                    "limits": {
+                        "window_seconds": config["LOGIN_WINDOW_SECONDS"],
+                        "max_per_ip": config["LOGIN_MAX_PER_IP"],
+                        "max_per_username": config["LOGIN_MAX_PER_USERNAME"],
+                    },
+                }
+            ),
+            200,
+        )
+
+    except Exception as e:
+        return (
+            jsonify({"error": f"Помилка отримання лічильників: {str(e)}"}),
+            500,
+        )
+
+
 # Middleware для перевірки авторизації
 @auth_bp.before_app_request
 def load_logged_in_user():
@@ -1,10 +1,18 @@
 from flask import Blueprint, request, jsonify, render_template
 from flask_login import login_required
-from models import Employee
+from models import (
+    EmailDelivery,
+    EmailLog,
+    Employee,
+    OutboxMessage,
+)
 from app import db
+from routes.groups import get_or_create_groups
+from services.import_service import EmployeeImportService
+from services.schedule_service import ScheduleService
+from services.unsubscribe_service import UnsubscribeService
 from utils.validators import Validators
-import csv
-import io
+import base64
 
 employees_bp = Blueprint("employees", __name__)
 
@@ -58,7 +66,9 @@ def get_employees_api():
         per_page = request.args.get("per_page", 10, type=int)
         search = request.args.get("search", "").strip()
 
-        query = Employee.query
+        query = Employee.query.options(
+            db.selectinload(Employee.groups), db.selectinload(Employee.schedule)
+        )
 
         if search:
             query = query.filter(
@@ -85,6 +95,10 @@ def get_employees_api():
                             "email": emp.email,
                             "birth_date": emp.birth_date.isoformat(),
                             "created_at": emp.created_at.isoformat(),
+                            "groups": [group.name for group in emp.groups],
+                            "timezone": (
+                                emp.schedule.timezone if emp.schedule else None
+                            ),
                         }
                         for emp in employees.items
                     ],
@@ -113,11 +127,14 @@ def create_employee():
         last_name = data.get("last_name", "").strip()
         email = data.get("email", "").strip().lower()
         birth_date = data.get("birth_date", "").strip()
+        timezone = (data.get("timezone") or "").strip() or None
 
         # Валідація
         errors = Validators.validate_employee_data(
             first_name, last_name, email, birth_date
         )
+        if not ScheduleService.is_valid_timezone(timezone):
+            errors.append("Некоректна часова зона")
         if errors:
             return jsonify({"errors": errors}), 400
 
@@ -140,6 +157,8 @@ def create_employee():
             email=email,
             birth_date=parsed_date,
         )
+        employee.groups = get_or_create_groups(data.get("groups", []))
+        ScheduleService.update(employee, timezone)
 
         db.session.add(employee)
         db.session.commit()
@@ -155,6 +174,8 @@ def create_employee():
                         "full_name": employee.full_name,
                         "email": employee.email,
                         "birth_date": employee.birth_date.isoformat(),
+                        "groups": [group.name for group in employee.groups],
+                        "timezone": employee.schedule.timezone,
                     },
                 }
             ),
@@ -183,11 +204,17 @@ def update_employee(employee_id):
         birth_date = data.get(
             "birth_date", employee.birth_date.strftime("%d.%m.%Y")
         ).strip()
+        timezone = data.get(
+            "timezone", employee.schedule and employee.schedule.timezone
+        )
+        timezone = (timezone or "").strip() or None
 
         # Валідація
         errors = Validators.validate_employee_data(
             first_name, last_name, email, birth_date
         )
+        if not ScheduleService.is_valid_timezone(timezone):
+            errors.append("Некоректна часова зона")
         if errors:
             return jsonify({"errors": errors}), 400
 
@@ -209,6 +236,9 @@ def update_employee(employee_id):
         employee.last_name = last_name
         employee.email = email
         employee.birth_date = parsed_date
+        if "groups" in data:
+            employee.groups = get_or_create_groups(data["groups"])
+        ScheduleService.update(employee, timezone)
 
         db.session.commit()
 
@@ -223,6 +253,8 @@ def update_employee(employee_id):
                         "full_name": employee.full_name,
                         "email": employee.email,
                         "birth_date": employee.birth_date.isoformat(),
+                        "groups": [group.name for group in employee.groups],
+                        "timezone": employee.schedule.timezone,
                     },
                 }
             ),
@@ -244,6 +276,21 @@ def delete_employee(employee_id):
     try:
         employee = Employee.query.get_or_404(employee_id)
 
+        # Листи черги про співробітника, журнал їх доставки та логи
+        # розсилки. PostgreSQL видалить їх і сам (ondelete), SQLite без
+        # PRAGMA foreign_keys — ні
+        outbox_ids = db.select(OutboxMessage.id).where(
+            OutboxMessage.employee_id == employee.id
+        )
+        EmailDelivery.query.filter(
+            EmailDelivery.outbox_id.in_(outbox_ids)
+        ).delete(synchronize_session=False)
+        OutboxMessage.query.filter_by(employee_id=employee.id).delete(
+            synchronize_session=False
+        )
+        EmailLog.query.filter_by(employee_id=employee.id).delete(
+            synchronize_session=False
+        )
         db.session.delete(employee)
         db.session.commit()
 
@@ -257,11 +304,64 @@ def delete_employee(employee_id):
         )
 
 
+@employees_bp.route("/<int:employee_id>/preferences", methods=["GET"])
+@login_required
+def get_preferences(employee_id):
+    """API: Налаштування розсилки співробітника"""
+    employee = Employee.query.get_or_404(employee_id)
+    return (
+        jsonify({"preferences": UnsubscribeService.get_preferences(employee)}),
+        200,
+    )
+
+
+@employees_bp.route("/<int:employee_id>/preferences", methods=["PUT"])
+@login_required
+def update_preferences(employee_id):
+    """API: Оновити налаштування розсилки (повна відписка або за групами)"""
+    try:
+        employee = Employee.query.get_or_404(employee_id)
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "Очікується JSON-об'єкт"}), 400
+        opted_out_groups = data.get("opted_out_groups") or []
+        if not isinstance(opted_out_groups, list):
+            return (
+                jsonify({"error": "opted_out_groups має бути списком"}),
+                400,
+            )
+
+        UnsubscribeService.set_preferences(
+            employee,
+            bool(data.get("opted_out", False)),
+            opted_out_groups,
+        )
+        db.session.commit()
+
+        return (
+            jsonify(
+                {
+                    "message": "Налаштування розсилки оновлено",
+                    "preferences": UnsubscribeService.get_preferences(employee),
+                }
+            ),
+            200,
+        )
+    except Exception as e:
+        db.session.rollback()
+        return (
+            jsonify({"error": f"Помилка оновлення налаштувань: {str(e)}"}),
+            500,
+        )
+
+
 @employees_bp.route("/import", methods=["POST"])
 @login_required
 def import_employees():
-    """Імпорт співробітників з CSV/Excel"""
+    """Імпорт співробітників з CSV/Excel (у фоні, через Celery)"""
     try:
+        from tasks.celery_tasks import import_employees_file
+
         if "file" not in request.files:
             return jsonify({"error": "Файл не надано"}), 400
 
@@ -270,208 +370,56 @@ def import_employees():
             return jsonify({"error": "Файл не вибрано"}), 400
 
         # Перевірка розширення файлу
-        filename = file.filename.lower()
-        if not (
-            filename.endswith(".csv")
-            or filename.endswith(".xlsx")
-            or filename.endswith(".xls")
-        ):
+        if not EmployeeImportService.is_supported(file.filename):
             return (
                 jsonify({"error": "Підтримуються тільки CSV та Excel файли"}),
                 400,
             )
 
-        created_count = 0
-        errors = []
-
-        try:
-            # Читання файлу в залежності від типу
-            if filename.endswith(".csv"):
-                # Читання CSV з правильним кодуванням
-                content = file.stream.read()
-
-                # Спроба визначити кодування
-                try:
-                    decoded_content = content.decode("utf-8")
-                except UnicodeDecodeError:
-                    try:
-                        decoded_content = content.decode(
-                            "cp1251"
-                        )  # Windows кодування
-                    except UnicodeDecodeError:
-                        decoded_content = content.decode(
-                            "utf-8", errors="replace"
-                        )
-
-                stream = io.StringIO(decoded_content)
-
-                # Спроба визначити роздільник
-                sample = decoded_content[:1024]
-                sniffer = csv.Sniffer()
-                try:
-                    delimiter = sniffer.sniff(sample).delimiter
-                except:
-                    delimiter = ","
-
-                csv_input = csv.DictReader(stream, delimiter=delimiter)
-
-            else:  # Excel файли
-                import pandas as pd
-
-                df = pd.read_excel(file.stream)
-                csv_input = df.to_dict("records")
-
-        except Exception as e:
-            return jsonify({"error": f"Помилка читання файлу: {str(e)}"}), 400
-
-        # Валідація заголовків
-        required_columns = ["first_name", "last_name", "email", "birth_date"]
-
-        if filename.endswith(".csv"):
-            # Для CSV перевіряємо fieldnames
-            if not csv_input.fieldnames:
-                return (
-                    jsonify({"error": "Файл порожній або не має заголовків"}),
-                    400,
-                )
-
-            actual_columns = [
-                col.strip().lower() for col in csv_input.fieldnames if col
-            ]
-
-            missing_columns = [
-                col for col in required_columns if col not in actual_columns
-            ]
-
-            if missing_columns:
-                return (
-                    jsonify(
-                        {
-                            "error": f"Відсутні обов'язкові колонки: {', '.join(missing_columns)}"
-                        }
-                    ),
-                    400,
-                )
-        else:
-            # Для Excel перевіряємо перший рядок
-            if not csv_input:
-                return jsonify({"error": "Файл порожній"}), 400
-
-            actual_columns = [
-                col.strip().lower() for col in csv_input[0].keys() if col
-            ]
-            missing_columns = [
-                col for col in required_columns if col not in actual_columns
-            ]
-
-            if missing_columns:
-                return (
-                    jsonify(
-                        {
-                            "error": f"Відсутні обов'язкові колонки: {', '.join(missing_columns)}"
-                        }
-                    ),
-                    400,
-                )
+        # Аргументи задачі серіалізуються в JSON, тому вміст — base64
+        content = base64.b64encode(file.stream.read()).decode("ascii")
+        job = import_employees_file.delay(file.filename, content)
 
-        # Обробка рядків
-        employees_to_add = []
-        existing_emails = set()
-
-        # Отримуємо всі існуючі emails одним запитом для оптимізації
-        all_existing_emails = {
-            emp.email for emp in db.session.query(Employee.email).all()
-        }
-
-        for row_num, row in enumerate(csv_input, start=2):
-            try:
-                # Нормалізація ключів для випадку з різними регістрами
-                normalized_row = {
-                    k.strip().lower(): v
-                    for k, v in row.items()
-                    if k is not None
+        return (
+            jsonify(
+                {
+                    "message": "Файл поставлено в чергу на імпорт",
+                    "job_id": job.id,
                 }
+            ),
+            202,
+        )
 
-                first_name = str(normalized_row.get("first_name", "")).strip()
-                last_name = str(normalized_row.get("last_name", "")).strip()
-                email = str(normalized_row.get("email", "")).strip().lower()
-                birth_date = str(normalized_row.get("birth_date", "")).strip()
+    except Exception as e:
+        return jsonify({"error": f"Загальна помилка імпорту: {str(e)}"}), 500
 
-                # Пропуск порожніх рядків
-                if not any([first_name, last_name, email, birth_date]):
-                    continue
 
-                # Валідація рядка
-                row_errors = Validators.validate_employee_data(
-                    first_name, last_name, email, birth_date
-                )
-                if row_errors:
-                    errors.append(f"Рядок {row_num}: {', '.join(row_errors)}")
-                    continue
-
-                # Перевірка унікальності (включаючи поточний batch)
-                if email in all_existing_emails or email in existing_emails:
-                    errors.append(f"Рядок {row_num}: Email {email} вже існує")
-                    continue
-
-                # Парсинг дати
-                is_valid, parsed_date = Validators.validate_birth_date(
-                    birth_date
-                )
-                if not is_valid:
-                    errors.append(
-                        f"Рядок {row_num}: Некоректна дата народження"
-                    )
-                    continue
-
-                # Додаємо до списку для batch insert
-                employees_to_add.append(
-                    Employee(
-                        first_name=first_name,
-                        last_name=last_name,
-                        email=email,
-                        birth_date=parsed_date,
-                    )
-                )
+@employees_bp.route("/import/<job_id>", methods=["GET"])
+@login_required
+def import_status(job_id):
+    """Статус імпорту: pending, done (з результатом) або failed"""
+    try:
+        from tasks.celery_tasks import import_employees_file
 
-                existing_emails.add(email)
-                created_count += 1
-
-            except Exception as e:
-                errors.append(f"Рядок {row_num}: Помилка обробки - {str(e)}")
-
-        # Batch insert для кращої продуктивності
-        if employees_to_add:
-            try:
-                db.session.bulk_save_objects(employees_to_add)
-                db.session.commit()
-            except Exception as e:
-                db.session.rollback()
-                return (
-                    jsonify(
-                        {"error": f"Помилка збереження в базу даних: {str(e)}"}
-                    ),
-                    500,
-                )
+        job = import_employees_file.AsyncResult(job_id)
 
-        # Підготовка результату
-        result = {
-            "message": f"Імпорт завершено. Створено: {created_count} співробітників",
-            "created_count": created_count,
-            "total_errors": len(errors),
-        }
+        if job.state == "SUCCESS":
+            result = job.result
+            if "error" in result:
+                return jsonify({"status": "failed", **result}), 200
+            return jsonify({"status": "done", **result}), 200
 
-        # Обмежуємо кількість помилок у відповіді
-        if errors:
-            result["errors"] = errors[:50]  # Показуємо тільки перші 50 помилок
-            if len(errors) > 50:
-                result[
-                    "message"
-                ] += f" (показано перші 50 з {len(errors)} помилок)"
+        if job.state == "FAILURE":
+            return (
+                jsonify({"status": "failed", "error": str(job.result)}),
+                200,
+            )
 
-        status_code = 200 if created_count > 0 else 400
-        return jsonify(result), status_code
+        # PENDING: ще в черзі (або невідомий id)
+        return jsonify({"status": "pending"}), 200
 
     except Exception as e:
-        db.session.rollback()
-        return jsonify({"error": f"Загальна помилка імпорту: {str(e)}"}), 500
+        return (
+            jsonify({"error": f"Помилка отримання статусу: {str(e)}"}),
+            500,
+        )
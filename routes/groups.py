@@ -0,0 +1,197 @@
+from flask import Blueprint, request, jsonify
+from flask_login import login_required
+from models import Employee, Group, GroupScope
+from app import db
+
+groups_bp = Blueprint("groups", __name__)
+
+
+def serialize_group(group, with_members=False):
+    """Перетворює об'єкт Group на словник."""
+    data = {
+        "id": group.id,
+        "name": group.name,
+        "notification_scope": group.notification_scope.value,
+        "members_count": len(group.members),
+        "created_at": group.created_at.isoformat() if group.created_at else None,
+    }
+    if with_members:
+        data["members"] = [
+            {"id": emp.id, "full_name": emp.full_name, "email": emp.email}
+            for emp in group.members
+        ]
+    return data
+
+
+def parse_scope(value):
+    """Перетворити рядок на GroupScope (None, якщо некоректний)"""
+    try:
+        return GroupScope(value)
+    except ValueError:
+        return None
+
+
+def get_or_create_groups(names):
+    """Знайти групи за назвами, створивши відсутні (без commit)"""
+    names = {name.strip() for name in names if name and name.strip()}
+    if not names:
+        return []
+
+    groups = Group.query.filter(Group.name.in_(names)).all()
+    existing = {group.name for group in groups}
+    for name in sorted(names - existing):
+        group = Group(name=name)
+        db.session.add(group)
+        groups.append(group)
+    return groups
+
+
+@groups_bp.route("/api", methods=["GET"])
+@login_required
+def get_groups():
+    """API: Отримати всі групи"""
+    try:
+        groups = Group.query.order_by(Group.name).all()
+        return (
+            jsonify({"groups": [serialize_group(group) for group in groups]}),
+            200,
+        )
+    except Exception as e:
+        return jsonify({"error": f"Помилка отримання груп: {str(e)}"}), 500
+
+
+@groups_bp.route("/api/<int:group_id>", methods=["GET"])
+@login_required
+def get_group(group_id):
+    """API: Отримати групу з учасниками"""
+    group = Group.query.get_or_404(group_id)
+    return jsonify({"group": serialize_group(group, with_members=True)}), 200
+
+
+@groups_bp.route("/api", methods=["POST"])
+@login_required
+def create_group():
+    """API: Створити нову групу"""
+    try:
+        data = request.get_json()
+        name = data.get("name", "").strip()
+        scope = parse_scope(
+            data.get("notification_scope", GroupScope.MEMBERS.value)
+        )
+
+        if len(name) < 2:
+            return (
+                jsonify({"error": "Назва повинна містити мінімум 2 символи"}),
+                400,
+            )
+        if scope is None:
+            return jsonify({"error": "Некоректна область сповіщень"}), 400
+        if Group.query.filter_by(name=name).first():
+            return jsonify({"error": "Група з такою назвою вже існує"}), 409
+
+        group = Group(name=name, notification_scope=scope)
+        db.session.add(group)
+        db.session.commit()
+
+        return (
+            jsonify(
+                {
+                    "message": "Група успішно створена",
+                    "group": serialize_group(group),
+                }
+            ),
+            201,
+        )
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Помилка створення групи: {str(e)}"}), 500
+
+
+@groups_bp.route("/api/<int:group_id>", methods=["PUT"])
+@login_required
+def update_group(group_id):
+    """API: Оновити групу"""
+    try:
+        group = Group.query.get_or_404(group_id)
+        data = request.get_json()
+
+        name = data.get("name", group.name).strip()
+        scope = parse_scope(
+            data.get("notification_scope", group.notification_scope.value)
+        )
+
+        if len(name) < 2:
+            return (
+                jsonify({"error": "Назва повинна містити мінімум 2 символи"}),
+                400,
+            )
+        if scope is None:
+            return jsonify({"error": "Некоректна область сповіщень"}), 400
+
+        existing_group = Group.query.filter_by(name=name).first()
+        if existing_group and existing_group.id != group_id:
+            return jsonify({"error": "Група з такою назвою вже існує"}), 409
+
+        group.name = name
+        group.notification_scope = scope
+        db.session.commit()
+
+        return (
+            jsonify(
+                {
+                    "message": "Групу успішно оновлено",
+                    "group": serialize_group(group),
+                }
+            ),
+            200,
+        )
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Помилка оновлення групи: {str(e)}"}), 500
+
+
+@groups_bp.route("/api/<int:group_id>", methods=["DELETE"])
+@login_required
+def delete_group(group_id):
+    """API: Видалити групу"""
+    try:
+        group = Group.query.get_or_404(group_id)
+        db.session.delete(group)
+        db.session.commit()
+        return jsonify({"message": "Групу успішно видалено"}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Помилка видалення групи: {str(e)}"}), 500
+
+
+@groups_bp.route("/api/<int:group_id>/members", methods=["PUT"])
+@login_required
+def set_group_members(group_id):
+    """API: Замінити склад групи"""
+    try:
+        group = Group.query.get_or_404(group_id)
+        data = request.get_json()
+        employee_ids = data.get("employee_ids", [])
+
+        employees = Employee.query.filter(Employee.id.in_(employee_ids)).all()
+        if len(employees) != len(set(employee_ids)):
+            return jsonify({"error": "Деяких співробітників не знайдено"}), 400
+
+        group.members = employees
+        db.session.commit()
+
+        return (
+            jsonify(
+                {
+                    "message": "Склад групи успішно оновлено",
+                    "group": serialize_group(group, with_members=True),
+                }
+            ),
+            200,
+        )
+    except Exception as e:
+        db.session.rollback()
+        return (
+            jsonify({"error": f"Помилка оновлення складу групи: {str(e)}"}),
+            500,
+        )
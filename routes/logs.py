@@ -4,7 +4,8 @@ from flask import Blueprint, request, jsonify, render_template, current_app
 from flask_login import login_required
 
 from app import db
-from models import EmailLog
+from models import EmailDelivery, EmailLog, SuppressedAddress
+from services.smtp_pool import SmtpPool
 
 logs_bp = Blueprint("logs", __name__)
 
@@ -133,9 +134,10 @@ def get_stats():
             EmailLog.status == "failed"
         ).count()
 
+        # Частково доставлені спроби теж охопили отримувачів
         total_recipients = (
             db.session.query(db.func.sum(EmailLog.recipients_count))
-            .filter(EmailLog.status == "sent")
+            .filter(EmailLog.status.in_(("sent", "partial")))
             .scalar()
             or 0
         )
@@ -190,3 +192,142 @@ def get_stats():
             jsonify({"error": f"Помилка отримання статистики: {str(e)}"}),
             500,
         )
+
+
+@logs_bp.route("/api/deliveries", methods=["GET"])
+@login_required
+def get_deliveries():
+    """API: Журнал доставки по отримувачах з фільтрацією."""
+    try:
+        page = request.args.get("page", 1, type=int)
+        per_page = request.args.get("per_page", 15, type=int)
+        email = request.args.get("email", "").strip().lower()
+        status = request.args.get("status", "").strip()
+        outbox_id = request.args.get("outbox_id", type=int)
+
+        query = EmailDelivery.query
+        if email:
+            query = query.filter(EmailDelivery.email == email)
+        if status:
+            query = query.filter(EmailDelivery.status == status)
+        if outbox_id:
+            query = query.filter(EmailDelivery.outbox_id == outbox_id)
+
+        paginated = query.order_by(EmailDelivery.id.desc()).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+
+        deliveries = [
+            {
+                "id": delivery.id,
+                "outbox_id": delivery.outbox_id,
+                "email": delivery.email,
+                "status": delivery.status,
+                "smtp_code": delivery.smtp_code,
+                "smtp_response": delivery.smtp_response,
+                "attempt": delivery.attempt,
+                "created_at": convert_to_local_time(
+                    delivery.created_at
+                ).strftime("%d.%m.%Y %H:%M"),
+            }
+            for delivery in paginated.items
+        ]
+
+        return (
+            jsonify(
+                {
+                    "deliveries": deliveries,
+                    "total": paginated.total,
+                    "pages": paginated.pages,
+                    "current_page": page,
+                }
+            ),
+            200,
+        )
+
+    except Exception as e:
+        return (
+            jsonify({"error": f"Помилка отримання журналу доставки: {str(e)}"}),
+            500,
+        )
+
+
+@logs_bp.route("/api/suppressed", methods=["GET"])
+@login_required
+def get_suppressed():
+    """API: Звіт про виключені адреси (відмови доставки)."""
+    try:
+        page = request.args.get("page", 1, type=int)
+        per_page = request.args.get("per_page", 15, type=int)
+
+        query = SuppressedAddress.query.filter(
+            SuppressedAddress.suppressed.is_(True)
+        ).order_by(SuppressedAddress.last_bounced_at.desc())
+        paginated = query.paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+
+        addresses = [
+            {
+                "id": address.id,
+                "email": address.email,
+                "bounce_type": address.bounce_type,
+                "status_code": address.status_code,
+                "diagnostic": address.diagnostic,
+                "soft_count": address.soft_count,
+                "last_bounced_at": convert_to_local_time(
+                    address.last_bounced_at
+                ).strftime("%d.%m.%Y %H:%M"),
+            }
+            for address in paginated.items
+        ]
+
+        return (
+            jsonify(
+                {
+                    "addresses": addresses,
+                    "total": paginated.total,
+                    "pages": paginated.pages,
+                    "current_page": page,
+                }
+            ),
+            200,
+        )
+
+    except Exception as e:
+        return (
+            jsonify({"error": f"Помилка отримання виключених адрес: {str(e)}"}),
+            500,
+        )
+
+
+@logs_bp.route("/api/suppressed/<int:address_id>", methods=["DELETE"])
+@login_required
+def unsuppress_address(address_id):
+    """API: Повернути адресу в розсилку (напр. після виправлення скриньки)."""
+    try:
+        address = SuppressedAddress.query.get_or_404(address_id)
+        db.session.delete(address)
+        db.session.commit()
+        return jsonify({"message": "Адресу повернуто в розсилку"}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return (
+            jsonify({"error": f"Помилка оновлення адреси: {str(e)}"}),
+            500,
+        )
+
+
+@logs_bp.route("/api/smtp-providers", methods=["GET"])
+@login_required
+def get_smtp_providers():
+    """API: Стан SMTP провайдерів, затримка та частка помилок за добу."""
+    try:
+        return jsonify({"providers": SmtpPool.status()}), 200
+
+    except Exception as e:
+        return (
+            jsonify({"error": f"Помилка отримання стану SMTP: {str(e)}"}),
+            500,
+        )
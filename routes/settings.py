@@ -3,6 +3,7 @@ from flask_login import login_required, current_user
 
 from app import create_app
 from models import AdminRole
+from services.settings_service import SettingsService
 
 settings_bp = Blueprint("settings", __name__)
 
@@ -47,20 +48,35 @@ def update_smtp_settings():
             "server",
             "port",
             "username",
-            "password",
             "default_sender",
         ]
         for field in required_fields:
             if not data.get(field):
                 return jsonify({"error": f"Поле {field} обов'язкове"}), 400
 
-        # Оновлення конфігурації (в реальному додатку це має зберігатися в БД або .env файлі)
-        current_app.config["MAIL_SERVER"] = data["server"]
-        current_app.config["MAIL_PORT"] = int(data["port"])
-        current_app.config["MAIL_USE_TLS"] = data.get("use_tls", True)
-        current_app.config["MAIL_USERNAME"] = data["username"]
-        current_app.config["MAIL_PASSWORD"] = data["password"]
-        current_app.config["MAIL_DEFAULT_SENDER"] = data["default_sender"]
+        # Пароль не зберігається в БД: його задає MAIL_PASSWORD у .env
+        password = data.get("password")
+        if password and password != current_app.config.get("MAIL_PASSWORD"):
+            return (
+                jsonify(
+                    {
+                        "error": "Пароль SMTP змінюється лише змінною "
+                        "MAIL_PASSWORD у .env"
+                    }
+                ),
+                400,
+            )
+
+        # Зберігаємо в БД: інші веб-процеси та воркери підхоплять зміни
+        SettingsService.save(
+            {
+                "MAIL_SERVER": data["server"],
+                "MAIL_PORT": int(data["port"]),
+                "MAIL_USE_TLS": data.get("use_tls", True),
+                "MAIL_USERNAME": data["username"],
+                "MAIL_DEFAULT_SENDER": data["default_sender"],
+            }
+        )
 
         return jsonify({"message": "SMTP налаштування успішно оновлені"}), 200
 
@@ -71,16 +87,89 @@ def update_smtp_settings():
         )
 
 
+@settings_bp.route("/delivery", methods=["GET"])
+@login_required
+def get_delivery_settings():
+    """Отримати розклад розсилки та політику повторів"""
+    if not current_user.has_role(AdminRole.SUPER_ADMIN):
+        return jsonify({"error": "Недостатньо прав"}), 403
+
+    return (
+        jsonify(
+            {
+                "delivery": {
+                    "send_time": current_app.config.get("EMAIL_SEND_TIME"),
+                    "prepare_time": current_app.config.get(
+                        "EMAIL_PREPARE_TIME"
+                    ),
+                    "retry_attempts": current_app.config.get("RETRY_ATTEMPTS"),
+                    "retry_delay": current_app.config.get("RETRY_DELAY"),
+                }
+            }
+        ),
+        200,
+    )
+
+
+@settings_bp.route("/delivery", methods=["POST"])
+@login_required
+def update_delivery_settings():
+    """Оновити розклад розсилки та політику повторів"""
+    if not current_user.has_role(AdminRole.SUPER_ADMIN):
+        return jsonify({"error": "Недостатньо прав"}), 403
+
+    try:
+        data = request.get_json()
+
+        # Поле запиту -> (налаштування, мінімум, максимум)
+        fields = {
+            "send_time": ("EMAIL_SEND_TIME", 0, 23),
+            "prepare_time": ("EMAIL_PREPARE_TIME", 0, 23),
+            "retry_attempts": ("RETRY_ATTEMPTS", 1, 10),
+            "retry_delay": ("RETRY_DELAY", 1, 86400),
+        }
+        values = {}
+        for field, (key, minimum, maximum) in fields.items():
+            if field not in data:
+                continue
+            try:
+                value = int(data[field])
+            except (TypeError, ValueError):
+                return jsonify({"error": f"Поле {field} має бути числом"}), 400
+            if not minimum <= value <= maximum:
+                return (
+                    jsonify(
+                        {
+                            "error": f"Поле {field} має бути від {minimum} до {maximum}"
+                        }
+                    ),
+                    400,
+                )
+            values[key] = value
+
+        if not values:
+            return jsonify({"error": "Немає налаштувань для оновлення"}), 400
+
+        SettingsService.save(values)
+
+        return jsonify({"message": "Налаштування розсилки оновлені"}), 200
+
+    except Exception as e:
+        return (
+            jsonify({"error": f"Помилка оновлення налаштувань: {str(e)}"}),
+            500,
+        )
+
+
 @settings_bp.route("/test-email", methods=["POST"])
 @login_required
 def test_email():
-    """Тестова відправка email"""
+    """Тестова відправка email (у фоні, через Celery)"""
     if not current_user.has_role(AdminRole.SUPER_ADMIN):
         return jsonify({"error": "Недостатньо прав"}), 403
 
     try:
-        from flask_mail import Message
-        from app import mail
+        from tasks.celery_tasks import send_test_email
 
         data = request.get_json()
         test_email = data.get("email")
@@ -88,19 +177,17 @@ def test_email():
         if not test_email:
             return jsonify({"error": "Email для тесту не вказаний"}), 400
 
-        # Створення тестового повідомлення
-        msg = Message(
-            subject="Тестове повідомлення Birthday App",
-            recipients=[test_email],
-            body="Це тестове повідомлення для перевірки налаштувань SMTP.",
-            sender=current_app.config["MAIL_DEFAULT_SENDER"],
-        )
-
-        mail.send(msg)
+        # Необов'язково: назва провайдера з SMTP_PROVIDERS
+        job = send_test_email.delay(test_email, data.get("provider") or None)
 
         return (
-            jsonify({"message": "Тестове повідомлення успішно відправлено"}),
-            200,
+            jsonify(
+                {
+                    "message": "Тестове повідомлення поставлено в чергу",
+                    "job_id": job.id,
+                }
+            ),
+            202,
         )
 
     except Exception as e:
@@ -114,6 +201,45 @@ def test_email():
         )
 
 
+@settings_bp.route("/test-email/<job_id>", methods=["GET"])
+@login_required
+def test_email_status(job_id):
+    """Статус тестового листа та тривалість етапів SMTP (мс)"""
+    if not current_user.has_role(AdminRole.SUPER_ADMIN):
+        return jsonify({"error": "Недостатньо прав"}), 403
+
+    try:
+        from tasks.celery_tasks import send_test_email
+
+        job = send_test_email.AsyncResult(job_id)
+
+        if job.state == "PROGRESS":
+            return jsonify({"status": "running", **job.info}), 200
+
+        if job.state == "SUCCESS":
+            result = job.result
+            if result["success"]:
+                return jsonify({"status": "sent", **result}), 200
+            if result["stage"] == "rate_limit":
+                return jsonify({"status": "rate_limited", **result}), 200
+            return jsonify({"status": "failed", **result}), 200
+
+        if job.state == "FAILURE":
+            return (
+                jsonify({"status": "failed", "error": str(job.result)}),
+                200,
+            )
+
+        # PENDING: ще в черзі (або невідомий id)
+        return jsonify({"status": "pending"}), 200
+
+    except Exception as e:
+        return (
+            jsonify({"error": f"Помилка отримання статусу: {str(e)}"}),
+            500,
+        )
+
+
 if __name__ == "__main__":
     app = create_app()
     app.run(debug=True)
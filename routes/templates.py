@@ -2,7 +2,9 @@ from flask import Blueprint, request, jsonify, render_template
 from flask_login import login_required
 from models import EmailTemplate, Employee
 from app import db
-from services.email_service import EmailService
+from services.outbox_service import OutboxService
+from services.read_models import EmployeeReadModel
+from services.template_renderer import TemplateRenderer
 
 # Створюємо blueprint для сторінки та API
 templates_bp = Blueprint("templates", __name__)
@@ -30,8 +32,8 @@ def templates_page():
         templates = EmailTemplate.query.order_by(
             EmailTemplate.created_at.desc()
         ).all()
-        # Сортування за фактичними стовпцями бази даних
-        employees = Employee.query.order_by(Employee.first_name, Employee.last_name).all()
+        # Лише id та ім'я для випадаючого списку, без повних ORM-об'єктів
+        employees = EmployeeReadModel.list_choices()
         return render_template(
             "templates.html", templates=templates, employees=employees
         )
@@ -92,6 +94,9 @@ def create_template():
             is_active=is_active,
         )
         db.session.add(template)
+        if is_active:
+            # Підготовлені наперед листи зрендерені іншим шаблоном
+            OutboxService.discard_prepared()
         db.session.commit()
 
         # ВИПРАВЛЕНО: Використання допоміжної функції замість to_dict()
@@ -134,6 +139,8 @@ def update_template(template_id):
         template.subject = subject
         template.template_text = template_text
         template.is_active = is_active
+        if template.is_active:
+            OutboxService.discard_prepared()
         db.session.commit()
 
         # ВИПРАВЛЕНО: Використання допоміжної функції замість to_dict()
@@ -178,6 +185,32 @@ def preview_template(template_id):
         template = EmailTemplate.query.get_or_404(template_id)
         data = request.get_json()
         employee_id = data.get("employee_id")
+        employee_ids = data.get("employee_ids")
+
+        # Масовий перегляд для кількох співробітників
+        if employee_ids:
+            employees = Employee.query.filter(
+                Employee.id.in_(employee_ids)
+            ).all()
+            previews = TemplateRenderer.render_many(template, employees)
+            return (
+                jsonify(
+                    {
+                        "previews": [
+                            {
+                                "subject": item["subject"],
+                                "body": item["body"],
+                                "employee_used": {
+                                    "id": item["employee"].id,
+                                    "full_name": item["employee"].full_name,
+                                },
+                            }
+                            for item in previews
+                        ]
+                    }
+                ),
+                200,
+            )
 
         if not employee_id:
             employee = Employee.query.order_by(Employee.first_name, Employee.last_name).first()
@@ -193,11 +226,8 @@ def preview_template(template_id):
         else:
             employee = Employee.query.get_or_404(employee_id)
 
-        formatted_subject = EmailService.format_template(
-            template.subject, employee
-        )
-        formatted_text = EmailService.format_template(
-            template.template_text, employee
+        formatted_subject, formatted_text = TemplateRenderer.render(
+            template, employee
         )
 
         return (
@@ -230,6 +260,7 @@ def activate_template(template_id):
         template = EmailTemplate.query.get_or_404(template_id)
         EmailTemplate.query.update({"is_active": False})
         template.is_active = True
+        OutboxService.discard_prepared()
         db.session.commit()
         return jsonify({"message": "Шаблон успішно активований"}), 200
     except Exception as e:
@@ -0,0 +1,54 @@
+from flask import Blueprint, request, render_template
+from app import db
+from services.unsubscribe_service import UnsubscribeService
+
+unsubscribe_bp = Blueprint("unsubscribe", __name__)
+
+
+def render_preferences(employee, token, saved=False):
+    """Сторінка налаштувань розсилки для отримувача"""
+    return render_template(
+        "unsubscribe.html",
+        token=token,
+        employee=employee,
+        preferences=UnsubscribeService.get_preferences(employee),
+        saved=saved,
+    )
+
+
+@unsubscribe_bp.route("/<token>", methods=["GET"])
+def unsubscribe_page(token):
+    """Сторінка відписки за підписаним посиланням (без авторизації)"""
+    email = UnsubscribeService.load_token(token)
+    employee = email and UnsubscribeService.get_employee_by_email(email)
+    if not employee:
+        return render_template("unsubscribe.html", invalid=True), 404
+
+    return render_preferences(employee, token)
+
+
+@unsubscribe_bp.route("/<token>", methods=["POST"])
+def unsubscribe(token):
+    """Зберегти налаштування або відписатися в один клік (RFC 8058)"""
+    email = UnsubscribeService.load_token(token)
+    employee = email and UnsubscribeService.get_employee_by_email(email)
+    if not employee:
+        return render_template("unsubscribe.html", invalid=True), 404
+
+    try:
+        if request.form.get("List-Unsubscribe") == "One-Click":
+            # Поштовий клієнт: повна відписка без сторінки
+            UnsubscribeService.set_preferences(employee, True, [])
+            db.session.commit()
+            return "", 204
+
+        UnsubscribeService.set_preferences(
+            employee,
+            request.form.get("opted_out") == "1",
+            request.form.getlist("group_ids", type=int),
+        )
+        db.session.commit()
+        return render_preferences(employee, token, saved=True)
+    except Exception:
+        db.session.rollback()
+        return render_template("unsubscribe.html", invalid=True, error=True), 500
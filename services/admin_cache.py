@@ -0,0 +1,71 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+
+from app import db
+from models import Admin
+
+
+class AdminCache:
+    """Кеш адміністраторів для Flask-Login у пам'яті процесу
+
+    Без кешу user_loader робить запит до БД на кожен авторизований запит.
+    Запис живе AUTH_CACHE_TTL секунд. Маршрути керування користувачами
+    та ORM-події скидають його одразу, але лише в цьому процесі; масові
+    Query.update()/delete() і зміни з інших процесів видно після TTL.
+    """
+
+    # id -> (час закінчення, відокремлена копія Admin)
+    _local: Dict[int, Tuple[float, Admin]] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _snapshot(admin: Admin) -> Admin:
+        """Копія поза сесією з усіма колонками"""
+        copy = Admin(
+            id=admin.id,
+            username=admin.username,
+            password_hash=admin.password_hash,
+            role=admin.role,
+            created_at=admin.created_at,
+        )
+        make_transient_to_detached(copy)
+        return copy
+
+    @classmethod
+    def get(cls, admin_id: int) -> Optional[Admin]:
+        """Адміністратор у поточній сесії: з кешу або з БД"""
+        ttl = current_app.config["AUTH_CACHE_TTL"]
+        if ttl <= 0:
+            return db.session.get(Admin, admin_id)
+
+        with cls._lock:
+            cached = cls._local.get(admin_id)
+        if cached is not None and cached[0] > time.monotonic():
+            # load=False: об'єкт додається до сесії без SELECT
+            return db.session.merge(cached[1], load=False)
+
+        admin = db.session.get(Admin, admin_id)
+        if admin is not None:
+            with cls._lock:
+                cls._local[admin_id] = (
+                    time.monotonic() + ttl,
+                    cls._snapshot(admin),
+                )
+        return admin
+
+    @classmethod
+    def invalidate(cls, admin_id: int) -> None:
+        with cls._lock:
+            cls._local.pop(admin_id, None)
+
+
+@event.listens_for(Admin, "after_update")
+@event.listens_for(Admin, "after_delete")
+def _invalidate_admin(mapper, connection, admin):
+    # Пароль, роль, видалення — наступний запит перечитає з БД
+    AdminCache.invalidate(admin.id)
@@ -1,8 +1,9 @@
 from datetime import date
-from typing import List
+from typing import Any, Dict, List
 
 from app import db
 from services.email_service import EmailService
+from services.read_models import EmployeeReadModel
 from models import Employee
 
 
@@ -13,12 +14,17 @@ class BirthdayService:
         self.email_service = EmailService()
 
     @staticmethod
-    def get_upcoming_birthdays(days_ahead: int = 7) -> List[Employee]:
-        """Отримати найближчі дні народження"""
+    def get_upcoming_birthdays(days_ahead: int = 7) -> List[Dict[str, Any]]:
+        """Отримати найближчі дні народження
+
+        Словники з ключами employee, birthday_date, days_until, де
+        employee — EmployeeRow (read model), а не ORM-об'єкт Employee:
+        зв'язків і сесії в нього немає.
+        """
         today = date.today()
         upcoming = []
 
-        for employee in Employee.query.all():
+        for employee in EmployeeReadModel.iter_employees():
             # Створюємо дату ДН для поточного року
             try:
                 birthday_this_year = employee.birth_date.replace(
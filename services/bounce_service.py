@@ -0,0 +1,184 @@
+import logging
+import mailbox
+import os
+import re
+from datetime import datetime
+from email.message import Message
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+import pytz
+from flask import current_app
+
+from app import db
+from models import SuppressedAddress
+
+logger = logging.getLogger(__name__)
+
+STATUS_REGEX = re.compile(r"\b([245])\.\d{1,3}\.\d{1,3}\b")
+
+
+class Bounce(NamedTuple):
+    """Відмова доставки на одну адресу"""
+
+    email: str
+    bounce_type: str  # hard / soft
+    status_code: Optional[str]
+    diagnostic: Optional[str]
+    bounced_at: datetime
+
+
+def iter_mailbox(path: str) -> Iterator[Message]:
+    """Листи з каталогу Maildir або файлу mbox"""
+    if os.path.isdir(path):
+        box = mailbox.Maildir(path, factory=None, create=False)
+    else:
+        box = mailbox.mbox(path, create=False)
+    try:
+        yield from box
+    finally:
+        box.close()
+
+
+def get_message_date(msg: Message) -> datetime:
+    """Дата листа-відмови (naive UTC)"""
+    try:
+        parsed = parsedate_to_datetime(msg["Date"])
+    except (TypeError, ValueError):
+        return datetime.utcnow()
+    if parsed.tzinfo is None:
+        return parsed
+    return parsed.astimezone(pytz.utc).replace(tzinfo=None)
+
+
+def classify(action: str, status: Optional[str]) -> Optional[str]:
+    """hard / soft за полями DSN (None — не відмова)"""
+    action = action.lower()
+    if action in ("delivered", "relayed", "expanded"):
+        return None
+    if status and status.startswith("5") and action != "delayed":
+        return "hard"
+    if status and status.startswith("2"):
+        return None
+    return "soft"
+
+
+def parse_address(value: Optional[str]) -> Optional[str]:
+    """'rfc822; user@example.com' -> 'user@example.com'"""
+    if not value:
+        return None
+    address = value.split(";", 1)[-1].strip().strip("<>").lower()
+    return address if "@" in address else None
+
+
+class BounceService:
+    """Розбір відмов доставки (DSN) та список виключених адрес"""
+
+    @staticmethod
+    def parse_bounces(msg: Message) -> List[Bounce]:
+        """Витягти відмови з DSN (RFC 3464) або заголовка X-Failed-Recipients"""
+        bounced_at = get_message_date(msg)
+        bounces = []
+
+        for part in msg.walk():
+            if part.get_content_type() != "message/delivery-status":
+                continue
+            # Перший блок — поля повідомлення, далі — по блоку на отримувача
+            for block in (part.get_payload() or [])[1:]:
+                email = parse_address(
+                    block.get("Final-Recipient")
+                    or block.get("Original-Recipient")
+                )
+                if email is None:
+                    continue
+                match = STATUS_REGEX.search(block.get("Status", ""))
+                status = match.group(0) if match else None
+                bounce_type = classify(block.get("Action", "failed"), status)
+                if bounce_type:
+                    bounces.append(
+                        Bounce(
+                            email,
+                            bounce_type,
+                            status,
+                            block.get("Diagnostic-Code"),
+                            bounced_at,
+                        )
+                    )
+
+        # Не-DSN відмови (напр. Exim) — постійна відмова
+        if not bounces and msg.get("X-Failed-Recipients"):
+            for address in msg["X-Failed-Recipients"].split(","):
+                email = parse_address(address)
+                if email:
+                    bounces.append(
+                        Bounce(email, "hard", None, msg["Subject"], bounced_at)
+                    )
+
+        return bounces
+
+    @staticmethod
+    def apply_bounces(bounces: List[Bounce]) -> Dict[str, int]:
+        """Оновити список виключених адрес. Без commit"""
+        threshold = current_app.config["BOUNCE_SOFT_THRESHOLD"]
+        stats = {"bounces": 0, "hard": 0, "soft": 0, "suppressed": 0}
+        if not bounces:
+            return stats
+
+        # Усі відомі адреси одним запитом
+        existing = {
+            row.email: row
+            for row in SuppressedAddress.query.filter(
+                SuppressedAddress.email.in_({b.email for b in bounces})
+            )
+        }
+
+        for bounce in sorted(bounces, key=lambda b: b.bounced_at):
+            row = existing.get(bounce.email)
+            if row is None:
+                row = SuppressedAddress(
+                    email=bounce.email,
+                    bounce_type=bounce.bounce_type,
+                    soft_count=0,
+                    suppressed=False,
+                    first_bounced_at=bounce.bounced_at,
+                )
+                db.session.add(row)
+                existing[bounce.email] = row
+            elif row.last_bounced_at and bounce.bounced_at <= row.last_bounced_at:
+                continue  # вже оброблено (повторний запуск по тій самій скриньці)
+
+            stats["bounces"] += 1
+            stats[bounce.bounce_type] += 1
+            row.bounce_type = bounce.bounce_type
+            row.status_code = bounce.status_code
+            row.diagnostic = bounce.diagnostic
+            row.last_bounced_at = bounce.bounced_at
+
+            was_suppressed = row.suppressed
+            if bounce.bounce_type == "hard":
+                row.suppressed = True
+            else:
+                row.soft_count += 1
+                if row.soft_count >= threshold:
+                    row.suppressed = True
+            if row.suppressed and not was_suppressed:
+                stats["suppressed"] += 1
+
+        return stats
+
+    @classmethod
+    def process_mailbox(cls, path: str) -> Dict[str, int]:
+        """Обробити листи-відмови з mbox або Maildir"""
+        bounces = []
+        messages = 0
+        for msg in iter_mailbox(path):
+            messages += 1
+            try:
+                bounces.extend(cls.parse_bounces(msg))
+            except Exception as e:
+                logger.warning("Не вдалося розібрати лист-відмову: %s", e)
+
+        stats = cls.apply_bounces(bounces)
+        db.session.commit()
+        stats["messages"] = messages
+        return stats
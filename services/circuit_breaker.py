@@ -0,0 +1,164 @@
+import logging
+import smtplib
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import redis
+from flask import current_app
+
+from utils.redis_client import get_redis, report_redis_error
+
+logger = logging.getLogger(__name__)
+
+
+def is_transport_error(error: Exception) -> bool:
+    """Чи свідчить помилка про недоступність релею (а не про конкретний лист)"""
+    if isinstance(
+        error,
+        (
+            smtplib.SMTPServerDisconnected,
+            smtplib.SMTPConnectError,
+            smtplib.SMTPHeloError,
+            smtplib.SMTPAuthenticationError,
+            socket.timeout,
+            ConnectionError,
+        ),
+    ):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        # 4xx — тимчасова відмова релею (напр. 421 Service not available)
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    return isinstance(error, OSError)
+
+
+class SmtpCircuitBreaker:
+    """Запобіжник для SMTP: після N помилок поспіль відмовляє одразу
+
+    scope — окремий запобіжник (напр. для кожного провайдера SMTP).
+    """
+
+    KEY = "bdaygo:smtp:breaker"
+
+    # Локальний стан за scope, якщо Redis недоступний:
+    # scope -> [помилок поспіль, час розмикання, кінець пробного вікна]
+    _local: Dict[Optional[str], List] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _settings():
+        config = current_app.config
+        return config["SMTP_BREAKER_THRESHOLD"], config["SMTP_BREAKER_COOLDOWN"]
+
+    @classmethod
+    def _keys(cls, scope: Optional[str]) -> Tuple[str, str]:
+        key = f"{cls.KEY}:{scope}" if scope else cls.KEY
+        return key, f"{key}:probe"
+
+    @classmethod
+    def _state(cls, scope: Optional[str]) -> List:
+        return cls._local.setdefault(scope, [0, None, 0.0])
+
+    @classmethod
+    def _get_opened_at(cls, scope: Optional[str] = None) -> Optional[float]:
+        client = get_redis()
+        if client is not None:
+            try:
+                opened_at = client.hget(cls._keys(scope)[0], "opened_at")
+                return float(opened_at) if opened_at else None
+            except redis.RedisError:
+                report_redis_error()
+        return cls._state(scope)[1]
+
+    @classmethod
+    def retry_after(cls, scope: Optional[str] = None) -> float:
+        """Скільки секунд запобіжник ще буде розімкнений (0 — можна пробувати)"""
+        opened_at = cls._get_opened_at(scope)
+        if opened_at is None:
+            return 0.0
+        _, cooldown = cls._settings()
+        return max(0.0, opened_at + cooldown - time.time())
+
+    @classmethod
+    def allow_request(cls, scope: Optional[str] = None) -> bool:
+        """Чи можна зараз звертатися до SMTP (в напіввідкритому стані — одна проба)"""
+        opened_at = cls._get_opened_at(scope)
+        if opened_at is None:
+            return True
+
+        _, cooldown = cls._settings()
+        if time.time() < opened_at + cooldown:
+            return False
+
+        # Напіввідкритий стан: пропускаємо лише одну пробну відправку
+        client = get_redis()
+        if client is not None:
+            try:
+                return bool(
+                    client.set(
+                        cls._keys(scope)[1], 1, nx=True, ex=int(cooldown) or 1
+                    )
+                )
+            except redis.RedisError:
+                report_redis_error()
+
+        with cls._lock:
+            state = cls._state(scope)
+            now = time.monotonic()
+            if now < state[2]:
+                return False
+            state[2] = now + cooldown
+            return True
+
+    @classmethod
+    def record_success(cls, scope: Optional[str] = None) -> None:
+        """Успішна відправка замикає запобіжник"""
+        client = get_redis()
+        if client is not None:
+            try:
+                client.delete(*cls._keys(scope))
+            except redis.RedisError:
+                report_redis_error()
+
+        with cls._lock:
+            cls._local[scope] = [0, None, 0.0]
+
+    @classmethod
+    def record_failure(cls, scope: Optional[str] = None) -> None:
+        """Помилка транспорту; після порогу запобіжник розмикається"""
+        threshold, _ = cls._settings()
+        now = time.time()
+        key, probe_key = cls._keys(scope)
+
+        client = get_redis()
+        if client is not None:
+            try:
+                failures = client.hincrby(key, "failures", 1)
+                if failures >= threshold:
+                    pipe = client.pipeline()
+                    pipe.hset(key, "opened_at", now)
+                    pipe.delete(probe_key)
+                    pipe.execute()
+                    logger.warning(
+                        "SMTP запобіжник%s розімкнено після %d помилок",
+                        f" {scope}" if scope else "",
+                        failures,
+                    )
+                return
+            except redis.RedisError:
+                report_redis_error()
+
+        with cls._lock:
+            state = cls._state(scope)
+            state[0] += 1
+            if state[0] >= threshold:
+                state[1] = now
+                state[2] = 0.0
+                logger.warning(
+                    "SMTP запобіжник%s розімкнено після %d помилок",
+                    f" {scope}" if scope else "",
+                    state[0],
+                )
@@ -0,0 +1,226 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pytz
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from models import DailyRun, EmailTemplate
+from services.email_service import EmailService
+from services.schedule_service import ALL_SCOPE, ScheduleService
+from utils.task_lock import LeaseLost, current_fence, ensure_lease
+
+logger = logging.getLogger(__name__)
+
+
+class DailyRunService:
+    """Щоденні запуски розсилки: рівно один на дату та область, з догоном пропущених"""
+
+    @staticmethod
+    def claim(run_date: date, scope: str = ALL_SCOPE) -> Optional[DailyRun]:
+        """Атомарно захопити запуск (None — вже виконаний або виконується)"""
+        now = datetime.utcnow()
+        fence = current_fence()
+        try:
+            run = DailyRun(
+                run_date=run_date,
+                scope=scope,
+                status="running",
+                attempts=1,
+                claimed_at=now,
+                fence_token=fence,
+            )
+            db.session.add(run)
+            db.session.commit()
+            return run
+        except IntegrityError:
+            db.session.rollback()  # запис уже є (унікальний ключ)
+
+        # Повторно захоплюємо лише невдалий або завислий запуск
+        lease = timedelta(seconds=current_app.config["DAILY_RUN_LEASE_SECONDS"])
+        result = db.session.execute(
+            db.update(DailyRun)
+            .where(
+                DailyRun.run_date == run_date,
+                DailyRun.scope == scope,
+                db.or_(
+                    DailyRun.status == "failed",
+                    db.and_(
+                        DailyRun.status == "running",
+                        DailyRun.claimed_at < now - lease,
+                    ),
+                ),
+            )
+            .values(
+                status="running",
+                claimed_at=now,
+                fence_token=fence,
+                attempts=DailyRun.attempts + 1,
+                error_message=None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        if result.rowcount != 1:
+            return None
+        return DailyRun.query.filter_by(run_date=run_date, scope=scope).one()
+
+    @classmethod
+    def execute(
+        cls, run_date: date, scope: str, job: Callable[[], int]
+    ) -> Optional[int]:
+        """Виконати запуск, якщо вдалося його захопити; повертає к-ть листів"""
+        ensure_lease()
+        run = cls.claim(run_date, scope)
+        if run is None:
+            return None
+        attempt = run.attempts  # номер захоплення: наступне його збільшить
+
+        try:
+            queued = job()
+        except Exception as e:
+            db.session.rollback()
+            try:
+                cls.finish(
+                    run, attempt, status="failed", error_message=str(e)
+                )
+            except LeaseLost:
+                pass  # запуск уже веде новий власник
+            raise
+
+        cls.finish(
+            run,
+            attempt,
+            status="done",
+            queued=queued,
+            finished_at=datetime.utcnow(),
+        )
+        return queued
+
+    @staticmethod
+    def finish(run: DailyRun, attempt: int, **values) -> None:
+        """Записати підсумок запуску, лише якщо його не перехопили
+
+        Запуск з простроченою орендою може захопити інша задача: тоді
+        номер спроби та fencing token замка в рядку вже інші і запис
+        старого власника відкидається (LeaseLost).
+        """
+        fence = current_fence()
+        result = db.session.execute(
+            db.update(DailyRun)
+            .where(
+                DailyRun.id == run.id,
+                DailyRun.status == "running",
+                DailyRun.attempts == attempt,
+                (
+                    DailyRun.fence_token.is_(None)
+                    if fence is None
+                    else DailyRun.fence_token == fence
+                ),
+            )
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        if result.rowcount != 1:
+            logger.warning(
+                "Запуск %s (%s) вже захопив інший обробник, підсумок "
+                "не записано",
+                run.run_date,
+                run.scope,
+            )
+            raise LeaseLost(f"Запуск {run.run_date} ({run.scope}) перехоплено")
+
+    @staticmethod
+    def pending_dates(scope: str, last_date: date) -> List[date]:
+        """Дати у вікні догону, для яких ще немає успішного запуску"""
+        grace = current_app.config["DAILY_RUN_GRACE_DAYS"]
+        dates = [last_date - timedelta(days=days) for days in range(grace, -1, -1)]
+        claimed = set(
+            db.session.scalars(
+                db.select(DailyRun.run_date).where(
+                    DailyRun.scope == scope,
+                    DailyRun.run_date.in_(dates),
+                    DailyRun.status != "failed",
+                )
+            )
+        )
+        return [run_date for run_date in dates if run_date not in claimed]
+
+    @staticmethod
+    def last_due_date(local_now: datetime) -> date:
+        """Остання дата, година розсилки якої вже настала"""
+        if local_now.hour >= current_app.config["EMAIL_SEND_TIME"]:
+            return local_now.date()
+        return local_now.date() - timedelta(days=1)
+
+    @classmethod
+    def run_daily(
+        cls, template: EmailTemplate, now: Optional[datetime] = None
+    ) -> Dict[date, int]:
+        """Щоденна розсилка (одна зона) з догоном пропущених днів"""
+        email_service = EmailService()
+        local_now = (now or datetime.now(pytz.utc)).astimezone(
+            email_service.get_timezone()
+        )
+        results = {}
+
+        for run_date in cls.pending_dates(ALL_SCOPE, cls.last_due_date(local_now)):
+
+            def job(run_date=run_date):
+                queued = email_service.enqueue_notifications(run_date, template)
+                ScheduleService.roll_forward(ALL_SCOPE, run_date)
+                return queued
+
+            queued = cls.execute(run_date, ALL_SCOPE, job)
+            if queued is not None:
+                results[run_date] = queued
+        return results
+
+    @classmethod
+    def plan_timezones(
+        cls, template: EmailTemplate, now: Optional[datetime] = None
+    ) -> Dict[Tuple[str, date], int]:
+        """Погодинний планувальник: зони, де настав час розсилки, з догоном"""
+        ScheduleService.ensure_all()
+        db.session.commit()
+        email_service = EmailService()
+        results = {}
+
+        for scope, local_now in ScheduleService.local_now_by_scope(now):
+            for run_date in cls.pending_dates(scope, cls.last_due_date(local_now)):
+
+                def job(scope=scope, run_date=run_date):
+                    employees = ScheduleService.due_employees(scope, run_date)
+                    if current_app.config["EMAIL_DIGEST_MODE"]:
+                        queued = email_service.enqueue_digest(
+                            employees, template, run_date
+                        )
+                    else:
+                        queued = 0
+                        for employee in employees:
+                            entry = email_service.enqueue_notification(
+                                employee, template, run_date
+                            )
+                            if entry is not None:
+                                queued += 1
+                    ScheduleService.roll_forward(scope, run_date)
+                    return queued
+
+                queued = cls.execute(run_date, scope, job)
+                if queued is not None:
+                    results[(scope, run_date)] = queued
+        return results
+
+    @classmethod
+    def catch_up(cls, template: EmailTemplate) -> int:
+        """Догнати пропущені запуски (напр. після простою beat або воркера)"""
+        if current_app.config["EMAIL_PER_TIMEZONE"]:
+            results = cls.plan_timezones(template)
+        else:
+            results = cls.run_daily(template)
+        for key, queued in results.items():
+            logger.info("Запуск %s: листів у черзі %d", key, queued)
+        return sum(results.values())
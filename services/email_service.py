@@ -1,10 +1,26 @@
 from flask import current_app
-from flask_mail import Message
-from app import mail, db
-from models import Employee, EmailTemplate, EmailLog
-from datetime import date, timedelta
+from app import db, mail_state
+from models import Employee, EmailTemplate, EmailLog, OutboxMessage
+from services.outbox_service import OutboxService
+from services.read_models import EmployeeReadModel, EmployeeRow
+from services.smtp_pool import SmtpPool
+from services.unsubscribe_service import (
+    UNSUBSCRIBE_FOOTER,
+    UNSUBSCRIBE_MARKER,
+    UnsubscribeService,
+)
+from services.template_renderer import (
+    TemplateRenderer,
+    build_context,
+    compile_text,
+    next_birthday,
+)
+from datetime import date, datetime, time, timedelta
 import pytz
-from typing import List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from flask_mail import Message
 
 
 class EmailService:
@@ -44,82 +60,254 @@ class EmailService:
     def get_employees_for_notification(
         self,
         notification_date: date,
-    ) -> List[Employee]:
+    ) -> List[EmployeeRow]:
         """Отримати список співробітників про яких потрібно відправити повідомлення"""
-        employees_to_notify = []
-        current_year = notification_date.year
+        from services.schedule_service import ALL_SCOPE, ScheduleService
 
-        all_employees = Employee.query.all()  # Отримати всіх співробітників
+        # Пошук за індексом розкладу замість перебору всіх співробітників
+        ScheduleService.ensure_all()
+        return ScheduleService.due_employees(ALL_SCOPE, notification_date)
 
-        # Знаходимо співробітників, які повинні отримати повідомлення
-        for employee in all_employees:
-            expected_notification_date = self.get_notification_date(
-                employee.birth_date, current_year
-            )
+    @staticmethod
+    def format_template(template_text: str, employee: Employee) -> str:
+        """Форматування шаблону з плейсхолдерами"""
+        return compile_text(template_text).render(build_context(employee))
 
-            if expected_notification_date == notification_date:
-                employees_to_notify.append(employee)
+    @staticmethod
+    def make_message(
+        subject: str, body: str, recipients: List[str], template: EmailTemplate
+    ) -> "Message":
+        """Створити лист; з увімкненою відпискою — з міткою посилання"""
+        from flask_mail import Message
 
-        return employees_to_notify
+        mail_state(current_app._get_current_object())
+        msg = Message(
+            subject=subject,
+            recipients=recipients,
+            body=body,
+            sender=current_app.config["MAIL_DEFAULT_SENDER"],
+        )
+        if UnsubscribeService.enabled():
+            # Мітка замінюється персональним посиланням під час доставки
+            _, compiled_body = TemplateRenderer.compile(template)
+            if "unsubscribe_url" not in compiled_body.fields:
+                msg.body += UNSUBSCRIBE_FOOTER.format(
+                    unsubscribe_url=UNSUBSCRIBE_MARKER
+                )
+            msg.extra_headers = {
+                "List-Unsubscribe": f"<{UNSUBSCRIBE_MARKER}>",
+                "List-Unsubscribe-Post": "List-Unsubscribe=One-Click",
+            }
+        return msg
 
     @staticmethod
-    def format_template(template_text: str, employee: Employee) -> str:
-        """Форматування шаблону з плейсхолдерами"""
-        formatted_text = template_text.replace("{name}", employee.full_name)
-        dob: date = employee.birth_date.replace(year=date.today().year)
-        formatted_date = dob.strftime("%d.%m.%Y")
-        formatted_text = formatted_text.replace("{date}", formatted_date)
-        return formatted_text
+    def build_message(
+        employee: Employee,
+        template: EmailTemplate,
+        today: Optional[date] = None,
+    ) -> Tuple[Optional["Message"], List[str]]:
+        """Побудувати повідомлення про ДН співробітника"""
+        # Отримати всіх співробітників крім іменинника
+        recipient_emails = EmployeeReadModel.get_recipient_emails(employee.id)
 
-    def send_birthday_notification(
-        self, employee: Employee, template: EmailTemplate
-    ) -> Tuple[bool, str]:
-        """Відправити повідомлення про ДН конкретного співробітника"""
-        try:
-            # Отримати всіх співробітників крім іменинника
-            recipients = Employee.query.filter(
-                Employee.id != employee.id
-            ).all()
-            recipient_emails = [emp.email for emp in recipients]
+        if not recipient_emails:
+            return None, recipient_emails
 
-            if not recipient_emails:
-                return False, "Немає отримувачів для розсилки"
+        # Форматування повідомлення
+        formatted_subject, formatted_body = TemplateRenderer.render(
+            template,
+            employee,
+            today,
+            extra=UnsubscribeService.render_context(),
+        )
+
+        # Створення повідомлення
+        msg = EmailService.make_message(
+            formatted_subject, formatted_body, recipient_emails, template
+        )
+        return msg, recipient_emails
+
+    def get_send_datetime(self, send_date: date) -> datetime:
+        """Момент щоденної розсилки для дати (naive UTC)"""
+        send_time = time(hour=current_app.config["EMAIL_SEND_TIME"])
+        local_dt = self.get_timezone().localize(
+            datetime.combine(send_date, send_time)
+        )
+        return local_dt.astimezone(pytz.utc).replace(tzinfo=None)
+
+    def enqueue_notification(
+        self,
+        employee: Employee,
+        template: EmailTemplate,
+        send_date: Optional[date] = None,
+        available_at: Optional[datetime] = None,
+    ) -> Optional[OutboxMessage]:
+        """Поставити лист про ДН у чергу (ідемпотентно для дати). Без commit"""
+        send_date = send_date or date.today()
+        dedupe_key = OutboxService.make_dedupe_key(send_date, [employee.id])
+
+        entry = OutboxService.get_entry(dedupe_key)
+        if entry is not None and entry.status != "failed":
+            return entry  # вже в черзі або відправлено
+
+        msg, recipient_emails = self.build_message(
+            employee, template, today=send_date
+        )
+        if msg is None:
+            return None
+
+        if available_at is not None:
+            msg.date = pytz.utc.localize(available_at).timestamp()
+
+        return OutboxService.store(
+            entry,
+            dedupe_key,
+            [employee.id],
+            template.id,
+            send_date,
+            msg.as_bytes(),
+            recipient_emails,
+            available_at,
+        )
+
+    def enqueue_digest(
+        self,
+        employees: List[Employee],
+        template: EmailTemplate,
+        send_date: date,
+        available_at: Optional[datetime] = None,
+    ) -> int:
+        """Поставити у чергу дайджест: один лист на групу отримувачів. Без commit"""
+        employees_by_id = {employee.id: employee for employee in employees}
+
+        # Для кожного отримувача — набір іменинників, про яких він дізнається
+        # (іменинник не входить в аудиторію листа про себе)
+        coverage: Dict[str, set] = {}
+        for employee in employees:
+            for email in EmployeeReadModel.get_recipient_emails(employee.id):
+                coverage.setdefault(email, set()).add(employee.id)
 
-            # Форматування повідомлення
-            formatted_subject = self.format_template(
-                template.subject, employee
+        # Отримувачі з однаковим набором іменинників отримують один лист
+        groups: Dict[frozenset, List[str]] = {}
+        for email, employee_ids in coverage.items():
+            groups.setdefault(frozenset(employee_ids), []).append(email)
+
+        queued = 0
+        for employee_ids, recipient_emails in groups.items():
+            covered = sorted(
+                (employees_by_id[employee_id] for employee_id in employee_ids),
+                key=lambda employee: next_birthday(
+                    employee.birth_date, send_date
+                ),
             )
-            formatted_body = self.format_template(
-                template.template_text, employee
+            covered_ids = [employee.id for employee in covered]
+            dedupe_key = OutboxService.make_dedupe_key(
+                send_date, covered_ids, digest=True
             )
 
-            # Створення повідомлення
-            msg = Message(
-                subject=formatted_subject,
-                recipients=recipient_emails,
-                body=formatted_body,
-                sender=current_app.config["MAIL_DEFAULT_SENDER"],
+            entry = OutboxService.get_entry(dedupe_key)
+            if entry is not None and entry.status != "failed":
+                continue
+
+            subject, body = TemplateRenderer.render_digest(
+                template,
+                covered,
+                today=send_date,
+                extra=UnsubscribeService.render_context(),
             )
+            msg = self.make_message(subject, body, recipient_emails, template)
+            if available_at is not None:
+                msg.date = pytz.utc.localize(available_at).timestamp()
 
-            # Відправка
-            mail.send(msg)
+            OutboxService.store(
+                entry,
+                dedupe_key,
+                covered_ids,
+                template.id,
+                send_date,
+                msg.as_bytes(),
+                recipient_emails,
+                available_at,
+            )
+            queued += 1
 
-            # Логування успішної відправки
-            email_log = EmailLog(
-                employee_id=employee.id,
-                template_id=template.id,
-                recipients_count=len(recipient_emails),
-                status="sent",
+        return queued
+
+    def enqueue_notifications(
+        self,
+        send_date: date,
+        template: EmailTemplate,
+        available_at: Optional[datetime] = None,
+    ) -> int:
+        """Поставити у чергу листи про всі ДН на дату розсилки"""
+        employees = self.get_employees_for_notification(send_date)
+
+        if current_app.config["EMAIL_DIGEST_MODE"]:
+            queued = self.enqueue_digest(
+                employees, template, send_date, available_at
             )
-            db.session.add(email_log)
+        else:
+            queued = 0
+            for employee in employees:
+                entry = self.enqueue_notification(
+                    employee, template, send_date, available_at
+                )
+                if entry is not None:
+                    queued += 1
+
+        window = current_app.config["EMAIL_SEND_WINDOW_MINUTES"]
+        if window:
+            # Вікно доставки: кожному листу — свій час відправки
+            window_start = self.get_send_datetime(send_date)
+            OutboxService.plan_window(
+                send_date,
+                max(window_start, datetime.utcnow()),
+                window_start + timedelta(minutes=window),
+                weighted=(
+                    current_app.config["EMAIL_SEND_WINDOW_MODE"] == "weighted"
+                ),
+            )
+
+        db.session.commit()
+        return queued
+
+    def prepare_notifications(
+        self, send_date: date, template: EmailTemplate
+    ) -> int:
+        """Заздалегідь підготувати листи на дату розсилки"""
+        return self.enqueue_notifications(
+            send_date, template, self.get_send_datetime(send_date)
+        )
+
+    def send_birthday_notification(
+        self, employee: Employee, template: EmailTemplate
+    ) -> Tuple[bool, str]:
+        """Відправити повідомлення про ДН конкретного співробітника"""
+        try:
+            entry = self.enqueue_notification(employee, template)
             db.session.commit()
 
-            return (
-                True,
-                f"Повідомлення відправлено {len(recipient_emails)} співробітникам",
+            if entry is None:
+                return False, "Немає отримувачів для розсилки"
+            if entry.status == "sent":
+                return True, "Повідомлення вже відправлено"
+            if SmtpPool.retry_after() > 0:
+                return (
+                    False,
+                    "SMTP тимчасово недоступний, лист відкладено в черзі",
+                )
+
+            results = OutboxService.deliver(
+                OutboxService.claim_batch(ids=[entry.id])
             )
+            if not results:
+                return False, "Повідомлення вже в черзі на відправку"
+
+            return results[0]["success"], results[0]["message"]
 
         except Exception as e:
+            db.session.rollback()
+
             # Логування помилки
             email_log = EmailLog(
                 employee_id=employee.id,
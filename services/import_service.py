@@ -0,0 +1,275 @@
+import csv
+import io
+from typing import Any, Dict, Iterable, List, Tuple
+
+from app import db
+from models import Employee, employee_groups
+from routes.groups import get_or_create_groups
+from services.schedule_service import ScheduleService
+from utils.validators import Validators
+
+
+class EmployeeImportError(Exception):
+    """Файл не можна імпортувати (повідомлення — для користувача)"""
+
+
+class EmployeeImportService:
+    """Імпорт співробітників з CSV/Excel
+
+    Виконується задачею в черзі import, а не у веб-запиті: читання
+    Excel (pandas) і вставка тисяч рядків займають секунди.
+    """
+
+    REQUIRED_COLUMNS = ["first_name", "last_name", "email", "birth_date"]
+    # Скільки помилок рядків повертати у відповіді
+    MAX_ERRORS = 50
+
+    @staticmethod
+    def is_supported(filename: str) -> bool:
+        filename = filename.lower()
+        return filename.endswith((".csv", ".xlsx", ".xls"))
+
+    @staticmethod
+    def _read_rows(
+        filename: str, content: bytes
+    ) -> Tuple[List[str], Iterable[Dict[str, Any]]]:
+        """Заголовки та рядки файлу"""
+        try:
+            if filename.lower().endswith(".csv"):
+                # Спроба визначити кодування
+                try:
+                    decoded_content = content.decode("utf-8")
+                except UnicodeDecodeError:
+                    try:
+                        decoded_content = content.decode(
+                            "cp1251"
+                        )  # Windows кодування
+                    except UnicodeDecodeError:
+                        decoded_content = content.decode(
+                            "utf-8", errors="replace"
+                        )
+
+                # Спроба визначити роздільник
+                sample = decoded_content[:1024]
+                try:
+                    delimiter = csv.Sniffer().sniff(sample).delimiter
+                except csv.Error:
+                    delimiter = ","
+
+                rows = csv.DictReader(
+                    io.StringIO(decoded_content), delimiter=delimiter
+                )
+                if not rows.fieldnames:
+                    raise EmployeeImportError(
+                        "Файл порожній або не має заголовків"
+                    )
+                return list(rows.fieldnames), rows
+
+            import pandas as pd
+
+            rows = pd.read_excel(io.BytesIO(content)).to_dict("records")
+
+        except EmployeeImportError:
+            raise
+        except Exception as e:
+            raise EmployeeImportError(f"Помилка читання файлу: {str(e)}")
+
+        # Для Excel заголовки — ключі першого рядка
+        if not rows:
+            raise EmployeeImportError("Файл порожній")
+        return list(rows[0].keys()), rows
+
+    @classmethod
+    def run(cls, filename: str, content: bytes) -> Dict[str, Any]:
+        """Імпортувати файл; EmployeeImportError, якщо його не прочитати"""
+        columns, rows = cls._read_rows(filename, content)
+
+        # Валідація заголовків
+        actual_columns = [
+            str(col).strip().lower() for col in columns if col
+        ]
+        missing_columns = [
+            col for col in cls.REQUIRED_COLUMNS if col not in actual_columns
+        ]
+        if missing_columns:
+            raise EmployeeImportError(
+                f"Відсутні обов'язкові колонки: {', '.join(missing_columns)}"
+            )
+
+        created_count = 0
+        errors = []
+
+        # Обробка рядків
+        employees_to_add = []
+        existing_emails = set()
+        group_names_by_email = {}  # необов'язкова колонка groups
+        timezone_by_email = {}  # необов'язкова колонка timezone
+
+        # Отримуємо всі існуючі emails одним запитом для оптимізації
+        all_existing_emails = {
+            emp.email for emp in db.session.query(Employee.email).all()
+        }
+
+        for row_num, row in enumerate(rows, start=2):
+            try:
+                # Нормалізація ключів для випадку з різними регістрами
+                normalized_row = {
+                    str(k).strip().lower(): v
+                    for k, v in row.items()
+                    if k is not None
+                }
+
+                first_name = str(normalized_row.get("first_name", "")).strip()
+                last_name = str(normalized_row.get("last_name", "")).strip()
+                email = str(normalized_row.get("email", "")).strip().lower()
+                birth_date = str(normalized_row.get("birth_date", "")).strip()
+
+                # Пропуск порожніх рядків
+                if not any([first_name, last_name, email, birth_date]):
+                    continue
+
+                # Валідація рядка
+                row_errors = Validators.validate_employee_data(
+                    first_name, last_name, email, birth_date
+                )
+                if row_errors:
+                    errors.append(f"Рядок {row_num}: {', '.join(row_errors)}")
+                    continue
+
+                # Перевірка унікальності (включаючи поточний batch)
+                if email in all_existing_emails or email in existing_emails:
+                    errors.append(f"Рядок {row_num}: Email {email} вже існує")
+                    continue
+
+                # Парсинг дати
+                is_valid, parsed_date = Validators.validate_birth_date(
+                    birth_date
+                )
+                if not is_valid:
+                    errors.append(
+                        f"Рядок {row_num}: Некоректна дата народження"
+                    )
+                    continue
+
+                timezone = str(normalized_row.get("timezone") or "").strip()
+                if timezone.lower() == "nan":
+                    timezone = ""
+                if not ScheduleService.is_valid_timezone(timezone):
+                    errors.append(f"Рядок {row_num}: Некоректна часова зона")
+                    continue
+
+                # Додаємо до списку для batch insert
+                employees_to_add.append(
+                    Employee(
+                        first_name=first_name,
+                        last_name=last_name,
+                        email=email,
+                        birth_date=parsed_date,
+                    )
+                )
+
+                # Групи через ";" або "," (необов'язкова колонка)
+                groups_value = normalized_row.get("groups")
+                if groups_value and str(groups_value).strip().lower() != "nan":
+                    group_names_by_email[email] = [
+                        name.strip()
+                        for name in str(groups_value).replace(",", ";").split(";")
+                        if name.strip()
+                    ]
+
+                if timezone:
+                    timezone_by_email[email] = timezone
+
+                existing_emails.add(email)
+                created_count += 1
+
+            except Exception as e:
+                errors.append(f"Рядок {row_num}: Помилка обробки - {str(e)}")
+
+        # Batch insert для кращої продуктивності
+        if employees_to_add:
+            try:
+                cls._save(
+                    employees_to_add, group_names_by_email, timezone_by_email
+                )
+            except Exception as e:
+                db.session.rollback()
+                raise EmployeeImportError(
+                    f"Помилка збереження в базу даних: {str(e)}"
+                )
+
+        # Підготовка результату
+        result = {
+            "message": f"Імпорт завершено. Створено: {created_count} співробітників",
+            "created_count": created_count,
+            "total_errors": len(errors),
+        }
+
+        # Обмежуємо кількість помилок у відповіді
+        if errors:
+            result["errors"] = errors[: cls.MAX_ERRORS]
+            if len(errors) > cls.MAX_ERRORS:
+                result["message"] += (
+                    f" (показано перші {cls.MAX_ERRORS} з {len(errors)} помилок)"
+                )
+
+        return result
+
+    @staticmethod
+    def _save(
+        employees_to_add: List[Employee],
+        group_names_by_email: Dict[str, List[str]],
+        timezone_by_email: Dict[str, str],
+    ) -> None:
+        """Вставити співробітників, їх розклад і групи одним commit"""
+        db.session.bulk_save_objects(employees_to_add)
+
+        # id нових співробітників одним запитом
+        if group_names_by_email or timezone_by_email:
+            db.session.flush()
+            employee_ids = dict(
+                db.session.query(Employee.email, Employee.id).filter(
+                    Employee.email.in_(
+                        group_names_by_email.keys() | timezone_by_email.keys()
+                    )
+                )
+            )
+
+        # Розклад з часовою зоною (решту створить планувальник)
+        if timezone_by_email:
+            ScheduleService.insert_many(
+                [
+                    (
+                        employee_ids[emp.email],
+                        emp.birth_date,
+                        timezone_by_email[emp.email],
+                    )
+                    for emp in employees_to_add
+                    if emp.email in timezone_by_email
+                ]
+            )
+
+        # Членство в групах
+        if group_names_by_email:
+            groups = {
+                group.name: group
+                for group in get_or_create_groups(
+                    name
+                    for names in group_names_by_email.values()
+                    for name in names
+                )
+            }
+            db.session.flush()
+            db.session.execute(
+                employee_groups.insert(),
+                [
+                    {
+                        "employee_id": employee_ids[email],
+                        "group_id": groups[name].id,
+                    }
+                    for email, names in group_names_by_email.items()
+                    for name in set(names)
+                ],
+            )
+
+        db.session.commit()
@@ -0,0 +1,197 @@
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
+import redis
+from flask import current_app
+
+from utils.redis_client import get_redis, report_redis_error
+
+logger = logging.getLogger(__name__)
+
+# Ковзне вікно (журнал спроб у sorted set) для кількох ключів одразу.
+# ARGV: now_ms, window_ms, member, далі ліміт для кожного ключа.
+# Повертає {0, 0}, якщо спробу записано, інакше {мс до звільнення місця,
+# номер ключа (з 1), що спрацював}.
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local wait = 0
+local blocked = 0
+for i = 1, #KEYS do
+    redis.call('ZREMRANGEBYSCORE', KEYS[i], '-inf', now - window)
+    local limit = tonumber(ARGV[3 + i])
+    if redis.call('ZCARD', KEYS[i]) >= limit then
+        local oldest = redis.call('ZRANGE', KEYS[i], 0, 0, 'WITHSCORES')
+        local key_wait = tonumber(oldest[2]) + window - now
+        if key_wait > wait then
+            wait = key_wait
+            blocked = i
+        end
+    end
+end
+if wait > 0 then
+    return {math.ceil(wait), blocked}
+end
+for i = 1, #KEYS do
+    redis.call('ZADD', KEYS[i], now, ARGV[3])
+    redis.call('PEXPIRE', KEYS[i], window)
+end
+return {0, 0}
+"""
+
+# Лічильники для моніторингу
+COUNTERS = ("allowed", "limited_ip", "limited_username", "succeeded", "failed")
+
+
+class LoginThrottle:
+    """Ліміт спроб входу за IP та ім'ям користувача (ковзне вікно)
+
+    Перевірка виконується до check_password_hash, тож потік підбору
+    паролів не забирає CPU воркерів. Redis — спільний стан процесів,
+    без нього — локальний.
+    """
+
+    KEY_PREFIX = "bdaygo:login:"
+    STATS_KEY = "bdaygo:login:stats"
+
+    # Локальний стан: ключ -> мітки часу спроб (мс)
+    _local: Dict[str, Deque[float]] = {}
+    _stats: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+    _lock = threading.Lock()
+    _script = None
+
+    @classmethod
+    def _limits(cls, ip: str, username: str) -> List[Tuple[str, str, int]]:
+        """Активні ліміти: (вид, ключ, кількість спроб за вікно)"""
+        config = current_app.config
+        limits = []
+        if config["LOGIN_MAX_PER_IP"] > 0:
+            limits.append(
+                ("ip", f"{cls.KEY_PREFIX}ip:{ip}", config["LOGIN_MAX_PER_IP"])
+            )
+        if config["LOGIN_MAX_PER_USERNAME"] > 0:
+            limits.append(
+                (
+                    "username",
+                    f"{cls.KEY_PREFIX}user:{username.lower()}",
+                    config["LOGIN_MAX_PER_USERNAME"],
+                )
+            )
+        return limits
+
+    @classmethod
+    def _hit_redis(
+        cls, client, limits, now_ms, window_ms
+    ) -> Tuple[float, str]:
+        if cls._script is None:
+            cls._script = client.register_script(SLIDING_WINDOW_SCRIPT)
+        wait, blocked = cls._script(
+            keys=[key for _, key, _ in limits],
+            args=[now_ms, window_ms, uuid.uuid4().hex]
+            + [limit for _, _, limit in limits],
+            client=client,
+        )
+        return float(wait), limits[blocked - 1][0] if blocked else ""
+
+    @classmethod
+    def _hit_local(cls, limits, now_ms, window_ms) -> Tuple[float, str]:
+        with cls._lock:
+            if len(cls._local) > 10000:
+                # Прибрати ключі без спроб у вікні
+                for key in [
+                    key
+                    for key, hits in cls._local.items()
+                    if not hits or hits[-1] <= now_ms - window_ms
+                ]:
+                    del cls._local[key]
+
+            wait, blocked = 0.0, ""
+            for kind, key, limit in limits:
+                hits = cls._local.setdefault(key, deque())
+                while hits and hits[0] <= now_ms - window_ms:
+                    hits.popleft()
+                if len(hits) >= limit and hits[0] + window_ms - now_ms > wait:
+                    wait, blocked = hits[0] + window_ms - now_ms, kind
+            if wait > 0:
+                return wait, blocked
+
+            for _, key, _ in limits:
+                cls._local[key].append(now_ms)
+            return 0.0, ""
+
+    @classmethod
+    def hit(cls, ip: str, username: str) -> float:
+        """Записати спробу входу. 0 — дозволено, інакше секунди очікування"""
+        limits = cls._limits(ip, username)
+        if not limits:
+            return 0.0
+
+        now_ms = time.time() * 1000.0
+        window_ms = current_app.config["LOGIN_WINDOW_SECONDS"] * 1000.0
+        result = None
+        client = get_redis()
+        if client is not None:
+            try:
+                result = cls._hit_redis(client, limits, now_ms, window_ms)
+            except redis.RedisError as e:
+                logger.warning("Redis недоступний, локальний ліміт входу: %s", e)
+                report_redis_error()
+        if result is None:
+            result = cls._hit_local(limits, now_ms, window_ms)
+
+        wait_ms, kind = result
+        if wait_ms <= 0:
+            cls.record("allowed")
+            return 0.0
+
+        cls.record(f"limited_{kind}")
+        logger.warning(
+            "Вхід обмежено (%s): ip=%s, username=%s", kind, ip, username
+        )
+        return math.ceil(wait_ms / 1000.0)
+
+    @classmethod
+    def reset_username(cls, username: str) -> None:
+        """Після успішного входу скинути спроби для імені користувача"""
+        key = f"{cls.KEY_PREFIX}user:{username.lower()}"
+        client = get_redis()
+        if client is not None:
+            try:
+                client.delete(key)
+            except redis.RedisError:
+                report_redis_error()
+        with cls._lock:
+            cls._local.pop(key, None)
+
+    @classmethod
+    def record(cls, counter: str) -> None:
+        client = get_redis()
+        if client is not None:
+            try:
+                client.hincrby(cls.STATS_KEY, counter, 1)
+                return
+            except redis.RedisError:
+                report_redis_error()
+        with cls._lock:
+            cls._stats[counter] += 1
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        """Лічильники спроб входу (з моменту запуску Redis або процесу)"""
+        client = get_redis()
+        if client is not None:
+            try:
+                row = client.hgetall(cls.STATS_KEY)
+                return {
+                    counter: int(row.get(counter.encode(), 0))
+                    for counter in COUNTERS
+                }
+            except redis.RedisError:
+                report_redis_error()
+        with cls._lock:
+            return dict(cls._stats)
@@ -0,0 +1,492 @@
+import json
+import logging
+import smtplib
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from flask import current_app
+
+from app import db
+from models import DailyRun, EmailDelivery, EmailLog, OutboxMessage
+from services.circuit_breaker import SmtpCircuitBreaker, is_transport_error
+from services.rate_limiter import RateLimitExceeded
+from services.smtp_pool import SmtpPool, SmtpStats
+from services.unsubscribe_service import UnsubscribeService
+from utils.task_lock import ensure_lease
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxService:
+    """Транзакційний outbox: черга листів та їх пакетна доставка"""
+
+    @staticmethod
+    def make_dedupe_key(
+        send_date: date, employee_ids: List[int], digest: bool = False
+    ) -> str:
+        """Ключ ідемпотентності листа"""
+        ids = "-".join(str(employee_id) for employee_id in sorted(employee_ids))
+        prefix = "digest:" if digest else ""
+        return f"{prefix}{send_date.isoformat()}:{ids}"
+
+    @staticmethod
+    def get_entry(dedupe_key: str) -> Optional[OutboxMessage]:
+        """Отримати запис черги за ключем ідемпотентності"""
+        return OutboxMessage.query.filter_by(dedupe_key=dedupe_key).first()
+
+    @staticmethod
+    def store(
+        entry: Optional[OutboxMessage],
+        dedupe_key: str,
+        employee_ids: List[int],
+        template_id: int,
+        send_date: date,
+        payload: bytes,
+        recipients: List[str],
+        available_at: Optional[datetime] = None,
+    ) -> OutboxMessage:
+        """Додати лист у чергу (або перезаписати невдалий). Без commit"""
+        if entry is None:
+            entry = OutboxMessage(dedupe_key=dedupe_key, send_date=send_date)
+            db.session.add(entry)
+
+        entry.employee_id = employee_ids[0]
+        entry.employee_ids = (
+            json.dumps(employee_ids) if len(employee_ids) > 1 else None
+        )
+        entry.template_id = template_id
+        entry.recipients = json.dumps(recipients)
+        entry.recipients_count = len(recipients)
+        entry.payload = payload
+        entry.status = "pending"
+        entry.attempts = 0
+        entry.available_at = available_at
+        entry.claim_token = None
+        entry.locked_until = None
+        entry.error_message = None
+        return entry
+
+    @staticmethod
+    def discard_prepared() -> int:
+        """Видалити підготовлені наперед листи (напр. після зміни шаблону). Без commit
+
+        Лише для дат, щоденний запуск яких ще не відбувся: він поставить
+        їх у чергу знову. Листи запущеного дня (напр. розподілені по
+        вікну доставки) вже ніхто не створить повторно — їх не чіпаємо.
+        """
+        started_dates = db.select(DailyRun.run_date).where(
+            DailyRun.status != "failed"
+        )
+        return (
+            OutboxMessage.query.filter(
+                OutboxMessage.status == "pending",
+                OutboxMessage.attempts == 0,
+                OutboxMessage.available_at > datetime.utcnow(),
+                OutboxMessage.send_date.not_in(started_dates),
+            )
+            .execution_options(synchronize_session=False)
+            .delete()
+        )
+
+    @staticmethod
+    def plan_window(
+        send_date: date, start: datetime, end: datetime, weighted: bool = False
+    ) -> int:
+        """Розподілити невідправлені листи дати по вікну доставки. Без commit"""
+        rows = db.session.execute(
+            db.select(OutboxMessage.id, OutboxMessage.recipients_count)
+            .where(
+                OutboxMessage.send_date == send_date,
+                OutboxMessage.status == "pending",
+                OutboxMessage.attempts == 0,
+            )
+            .order_by(OutboxMessage.id)
+        ).all()
+        if not rows:
+            return 0
+
+        # Рівномірно за кількістю листів або пропорційно отримувачам,
+        # щоб навантаження на релей було рівним протягом усього вікна
+        weights = [count if weighted else 1 for _, count in rows]
+        total = sum(weights) or 1
+        span = max((end - start).total_seconds(), 0.0)
+
+        schedule = []
+        offset = 0
+        for (outbox_id, _), weight in zip(rows, weights):
+            schedule.append(
+                {
+                    "id": outbox_id,
+                    "available_at": start
+                    + timedelta(seconds=span * offset / total),
+                }
+            )
+            offset += weight
+
+        db.session.execute(db.update(OutboxMessage), schedule)
+        return len(schedule)
+
+    @staticmethod
+    def claim_batch(
+        limit: Optional[int] = None, ids: Optional[List[int]] = None
+    ) -> List[OutboxMessage]:
+        """Атомарно захопити пакет листів, готових до відправки"""
+        now = datetime.utcnow()
+        limit = limit or current_app.config["OUTBOX_BATCH_SIZE"]
+        lease = timedelta(seconds=current_app.config["OUTBOX_LEASE_SECONDS"])
+
+        # pending або processing з простроченою орендою (обробник впав)
+        claimable = db.or_(
+            OutboxMessage.status == "pending",
+            db.and_(
+                OutboxMessage.status == "processing",
+                OutboxMessage.locked_until < now,
+            ),
+        )
+        due = db.or_(
+            OutboxMessage.available_at.is_(None),
+            OutboxMessage.available_at <= now,
+        )
+        candidates = (
+            db.select(OutboxMessage.id)
+            .where(claimable, due)
+            .order_by(OutboxMessage.available_at, OutboxMessage.id)
+            .limit(limit)
+        )
+        if ids is not None:
+            candidates = candidates.where(OutboxMessage.id.in_(ids))
+
+        token = uuid4().hex
+        claim = (
+            db.update(OutboxMessage)
+            .values(
+                status="processing",
+                claim_token=token,
+                locked_until=now + lease,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        if db.session.get_bind().dialect.name == "postgresql":
+            # Паралельні обробники пропускають рядки, заблоковані іншими
+            claimed_ids = db.session.scalars(
+                candidates.with_for_update(skip_locked=True)
+            ).all()
+            if claimed_ids:
+                db.session.execute(
+                    claim.where(OutboxMessage.id.in_(claimed_ids))
+                )
+        else:
+            # SQLite: один UPDATE виконується під блокуванням запису БД,
+            # тому вибір і захоплення відбуваються атомарно
+            db.session.execute(
+                claim.where(
+                    OutboxMessage.id.in_(candidates.scalar_subquery()),
+                    claimable,
+                )
+            )
+        db.session.commit()
+
+        return (
+            OutboxMessage.query.options(db.joinedload(OutboxMessage.employee))
+            .filter_by(claim_token=token)
+            .order_by(OutboxMessage.id)
+            .all()
+        )
+
+    @staticmethod
+    def deliver(batch: List[OutboxMessage]) -> List[Dict[str, Any]]:
+        """Відправити захоплений пакет одним SMTP з'єднанням і записати логи пакетом"""
+        if not batch:
+            return []
+
+        # Токен захоплення пакета (спільний для всіх листів пакета)
+        token = batch[0].claim_token
+        config = current_app.config
+        sender = config["MAIL_DEFAULT_SENDER"]
+        max_attempts = config.get("RETRY_ATTEMPTS") or 1
+        retry_delay = timedelta(seconds=config.get("RETRY_DELAY") or 300)
+        results = []
+        logs = []
+        deliveries = []
+
+        def record(
+            item: OutboxMessage,
+            error: Optional[Exception] = None,
+            refused: Optional[Dict[str, Tuple[int, bytes]]] = None,
+            unsent: Optional[List[str]] = None,
+        ):
+            """unsent — адреси, до яких лист не дійшов через error
+            (за замовчуванням усі; частина — якщо копії вже прийнято)"""
+            item.claim_token = None
+            item.locked_until = None
+            item.attempts += 1
+
+            recipients = json.loads(item.recipients)
+            refused = refused or {}
+            if error is None:
+                unsent = []
+            elif unsent is None:
+                unsent = recipients
+            accepted = [
+                r for r in recipients if r not in refused and r not in unsent
+            ]
+            # Повторюємо лише не відправлені та тимчасові відмови (4xx)
+            retryable = unsent + [
+                r for r, (code, _) in refused.items() if 400 <= code < 500
+            ]
+
+            messages = []
+            if refused:
+                messages.append(
+                    "Відмова для адрес: "
+                    + ", ".join(
+                        f"{email} ({code})"
+                        for email, (code, _) in refused.items()
+                    )
+                )
+            if error is not None:
+                messages.append(str(error))
+            error_message = "; ".join(messages) or None
+
+            if retryable and item.attempts < max_attempts:
+                item.status = "pending"
+                item.available_at = datetime.utcnow() + retry_delay
+                item.recipients = json.dumps(retryable)
+                item.recipients_count = len(retryable)
+                # Підсумок ("sent"/"failed") пише остання спроба, тож
+                # частково доставлений лист не рахується двічі
+                status = "partial" if accepted else "retry"
+            elif accepted:
+                item.status = "sent"
+                item.sent_at = datetime.utcnow()
+                status = "sent"
+            else:
+                item.status = "failed"
+                status = "failed"
+            item.error_message = error_message
+
+            if accepted:
+                message = f"Повідомлення відправлено {len(accepted)} співробітникам"
+                if len(accepted) < len(recipients):
+                    message += (
+                        f" (не доставлено: {len(recipients) - len(accepted)})"
+                    )
+            else:
+                message = f"Помилка відправки: {error_message}"
+
+            # Журнал доставки по кожному отримувачу
+            for email in recipients:
+                delivery = {
+                    "outbox_id": item.id,
+                    "email": email,
+                    "status": "sent",
+                    "smtp_code": None,
+                    "smtp_response": None,
+                    "attempt": item.attempts,
+                }
+                if email in unsent:
+                    delivery.update(status="failed", smtp_response=str(error))
+                elif email in refused:
+                    code, response = refused[email]
+                    delivery.update(
+                        status="refused",
+                        smtp_code=code,
+                        smtp_response=response.decode(errors="replace"),
+                    )
+                deliveries.append(delivery)
+
+            # Лог для кожного іменинника (дайджест охоплює кількох)
+            covered = item.covered_employee_ids
+            logs.extend(
+                {
+                    "employee_id": employee_id,
+                    "template_id": item.template_id,
+                    "recipients_count": len(accepted),
+                    "status": status,
+                    "error_message": error_message,
+                }
+                for employee_id in covered
+            )
+            employee_name = item.employee.full_name
+            if len(covered) > 1:
+                employee_name += f" (+{len(covered) - 1})"
+            results.append(
+                {
+                    "employee_id": item.employee_id,
+                    "employee": employee_name,
+                    "success": bool(accepted),
+                    "message": message,
+                }
+            )
+
+        def defer(item: OutboxMessage, seconds: float):
+            # Не спроба відправки: повертаємо в чергу без лічильника спроб
+            item.status = "pending"
+            item.available_at = datetime.utcnow() + timedelta(seconds=seconds)
+            item.claim_token = None
+            item.locked_until = None
+
+        pool = SmtpPool()
+        # Успішні відправки: провайдер -> затримки листів (мс)
+        delivered: Dict[str, List[float]] = {}
+        try:
+            for index, item in enumerate(batch):
+                recipients = json.loads(item.recipients)
+                # З посиланнями відписки — окрема копія кожному отримувачу
+                copies = list(
+                    UnsubscribeService.personalize(item.payload, recipients)
+                )
+                # Копії до done вже прийняті релеєм: після збою з'єднання
+                # наступний провайдер відправляє лише решту
+                done = 0
+                # Адреси, які релей відхилив: email -> (код, відповідь)
+                refused = {}
+                failed = set()  # провайдери, що впали на цьому листі
+                last_error = None
+
+                def remaining() -> List[str]:
+                    return [
+                        email
+                        for copy_recipients, _ in copies[done:]
+                        for email in copy_recipients
+                    ]
+
+                while True:
+                    try:
+                        provider = pool.acquire(
+                            len(remaining()),
+                            len(copies) - done,
+                            exclude=failed,
+                        )
+                    except RateLimitExceeded as e:
+                        # Квоти вичерпані надовго — решта пакета чекає в черзі
+                        unsent_items = batch[index:]
+                        if done:
+                            # Частину копій прийнято: фіксуємо їх, решту
+                            # повторить наступна спроба
+                            record(
+                                unsent_items.pop(0), e, refused, remaining()
+                            )
+                        for deferred in unsent_items:
+                            defer(deferred, e.retry_after)
+                        provider = None
+                        break
+
+                    if provider is None:
+                        # Жоден провайдер не доступний: невдала спроба лише
+                        # для листа, на якому впав релей; решта чекає
+                        unsent_items = batch[index:]
+                        if last_error is not None:
+                            record(
+                                unsent_items.pop(0),
+                                last_error,
+                                refused,
+                                remaining(),
+                            )
+                        delay = (
+                            SmtpPool.retry_after() or retry_delay.total_seconds()
+                        )
+                        for deferred in unsent_items:
+                            defer(deferred, delay)
+                        break
+
+                    started = time.perf_counter()
+                    try:
+                        connection = pool.connect(provider)
+                        if connection.host is not None:
+                            for copy_recipients, payload in copies[done:]:
+                                try:
+                                    refused.update(
+                                        connection.host.sendmail(
+                                            sender, copy_recipients, payload
+                                        )
+                                    )
+                                except smtplib.SMTPRecipientsRefused as e:
+                                    refused.update(e.recipients)
+                                done += 1
+                    except Exception as e:
+                        SmtpStats.record(provider.name, errors=1)
+                        if is_transport_error(e):
+                            # Релей недоступний — пробуємо наступного провайдера
+                            pool.mark_down(provider, e)
+                            failed.add(provider.name)
+                            last_error = e
+                            continue
+                        # Помилка конкретного листа
+                        record(item, e, refused, remaining())
+                    else:
+                        record(item, refused=refused)
+                        delivered.setdefault(provider.name, []).append(
+                            (time.perf_counter() - started) * 1000
+                        )
+                    break
+
+                if provider is None:
+                    break
+        finally:
+            pool.close()
+
+        for provider in pool.providers:
+            latencies = delivered.get(provider.name)
+            if not latencies:
+                continue
+            SmtpCircuitBreaker.record_success(provider.scope)
+            SmtpStats.record(
+                provider.name, sent=len(latencies), latency_ms=sum(latencies)
+            )
+            logger.info(
+                "SMTP %s: відправлено %d, середня затримка %.0f мс",
+                provider.name,
+                len(latencies),
+                sum(latencies) / len(latencies),
+            )
+
+        # Оренда пакета могла минути, і листи захопив інший обробник:
+        # claim_token у рядку вже інший, тож стан листа не перезаписуємо
+        with db.session.no_autoflush:
+            owned = set(
+                db.session.scalars(
+                    db.select(OutboxMessage.id)
+                    .where(
+                        OutboxMessage.id.in_([item.id for item in batch]),
+                        OutboxMessage.claim_token == token,
+                    )
+                    .with_for_update()
+                )
+            )
+        for item in batch:
+            if item.id not in owned:
+                logger.warning(
+                    "Лист %s вже захопив інший обробник, стан не оновлено",
+                    item.id,
+                )
+                db.session.expunge(item)
+
+        # Логи пишемо multi-row INSERT разом зі статусами черги
+        if logs:
+            db.session.execute(db.insert(EmailLog), logs)
+        if deliveries:
+            db.session.execute(db.insert(EmailDelivery), deliveries)
+        db.session.commit()
+
+        return results
+
+    @classmethod
+    def deliver_pending(cls) -> List[Dict[str, Any]]:
+        """Доставити всі листи, готові до відправки"""
+        results = []
+        while True:
+            # Поки запобіжники всіх провайдерів розімкнені, листи лишаються
+            # в черзі
+            if SmtpPool.retry_after() > 0:
+                break
+            # Замок задачі втрачено — решту черги доставить новий власник
+            ensure_lease()
+            batch = cls.claim_batch()
+            if not batch:
+                break
+            results.extend(cls.deliver(batch))
+        return results
@@ -0,0 +1,180 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import redis
+from flask import current_app
+
+from utils.redis_client import get_redis, report_redis_error
+
+logger = logging.getLogger(__name__)
+
+# Атомарна перевірка та списання токенів з кількох бакетів одночасно.
+# ARGV: now_ms, далі для кожного бакета: capacity, refill_per_ms, cost.
+# Повертає "0" при успіху або час очікування в мс (рядком, щоб не втратити дробову частину).
+TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local wait = 0
+local tokens = {}
+for i = 1, #KEYS do
+    local base = 2 + (i - 1) * 3
+    local capacity = tonumber(ARGV[base])
+    local rate = tonumber(ARGV[base + 1])
+    local cost = tonumber(ARGV[base + 2])
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local available = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    available = math.min(capacity, available + math.max(0, now - ts) * rate)
+    tokens[i] = available
+    if available < cost then
+        wait = math.max(wait, (cost - available) / rate)
+    end
+end
+if wait > 0 then
+    return tostring(wait)
+end
+for i = 1, #KEYS do
+    local base = 2 + (i - 1) * 3
+    local capacity = tonumber(ARGV[base])
+    local rate = tonumber(ARGV[base + 1])
+    local cost = tonumber(ARGV[base + 2])
+    redis.call('HSET', KEYS[i], 'tokens', tokens[i] - cost, 'ts', now)
+    redis.call('PEXPIRE', KEYS[i], math.ceil(capacity / rate) + 1000)
+end
+return "0"
+"""
+
+# Бюджети: (назва, ключ конфігу, період в секундах)
+BUDGETS = (
+    ("messages:minute", "SMTP_MAX_MESSAGES_PER_MINUTE", 60),
+    ("messages:hour", "SMTP_MAX_MESSAGES_PER_HOUR", 3600),
+    ("recipients:minute", "SMTP_MAX_RECIPIENTS_PER_MINUTE", 60),
+    ("recipients:hour", "SMTP_MAX_RECIPIENTS_PER_HOUR", 3600),
+)
+
+
+class RateLimitExceeded(Exception):
+    """Квота SMTP вичерпана довше, ніж дозволено чекати"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(
+            f"Перевищено ліміт SMTP, повторіть через {retry_after:.0f} с"
+        )
+        self.retry_after = retry_after
+
+
+class SmtpRateLimiter:
+    """Token bucket для квот SMTP (Redis, з локальним запасним варіантом)"""
+
+    KEY_PREFIX = "bdaygo:smtp:bucket:"
+
+    # Локальний стан: ключ -> (токени, мітка часу в мс)
+    _local: Dict[str, Tuple[float, float]] = {}
+    _lock = threading.Lock()
+    _script = None
+
+    @staticmethod
+    def get_buckets(
+        messages: int,
+        recipients: int,
+        scope: Optional[str] = None,
+        limits: Optional[Dict[str, int]] = None,
+    ) -> List[Tuple[str, float, float, float]]:
+        """Активні бакети: (ключ, місткість, поповнення за мс, вартість)
+
+        scope — окремі бакети (напр. провайдер SMTP), limits — квоти
+        замість конфігу, за тими самими ключами (SMTP_MAX_...).
+        """
+        if limits is None:
+            limits = current_app.config
+        prefix = SmtpRateLimiter.KEY_PREFIX + (f"{scope}:" if scope else "")
+        buckets = []
+        for name, config_key, period in BUDGETS:
+            capacity = limits.get(config_key) or 0
+            if capacity <= 0:
+                continue  # ліміт вимкнено
+            cost = messages if name.startswith("messages") else recipients
+            buckets.append(
+                (
+                    prefix + name,
+                    float(capacity),
+                    capacity / (period * 1000.0),
+                    # Лист, більший за весь бюджет, чекає на повний бакет
+                    float(min(cost, capacity)),
+                )
+            )
+        return buckets
+
+    @classmethod
+    def _try_acquire_redis(cls, client: redis.Redis, buckets, now_ms) -> float:
+        if cls._script is None:
+            cls._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+        args = [now_ms]
+        for _, capacity, rate, cost in buckets:
+            args.extend((capacity, rate, cost))
+        keys = [key for key, _, _, _ in buckets]
+        return float(cls._script(keys=keys, args=args, client=client))
+
+    @classmethod
+    def _try_acquire_local(cls, buckets, now_ms) -> float:
+        with cls._lock:
+            wait = 0.0
+            tokens = []
+            for key, capacity, rate, cost in buckets:
+                available, ts = cls._local.get(key, (capacity, now_ms))
+                available = min(capacity, available + max(0.0, now_ms - ts) * rate)
+                tokens.append(available)
+                if available < cost:
+                    wait = max(wait, (cost - available) / rate)
+
+            if wait > 0:
+                return wait
+
+            for (key, _, _, cost), available in zip(buckets, tokens):
+                cls._local[key] = (available - cost, now_ms)
+            return 0.0
+
+    @classmethod
+    def try_acquire(
+        cls,
+        recipients: int,
+        messages: int = 1,
+        scope: Optional[str] = None,
+        limits: Optional[Dict[str, int]] = None,
+    ) -> float:
+        """Спробувати списати токени. Повертає 0 або секунди до наступної спроби"""
+        buckets = cls.get_buckets(messages, recipients, scope, limits)
+        if not buckets:
+            return 0.0
+
+        now_ms = time.time() * 1000.0
+        client = get_redis()
+        if client is not None:
+            try:
+                return cls._try_acquire_redis(client, buckets, now_ms) / 1000.0
+            except redis.RedisError as e:
+                logger.warning("Redis недоступний, локальний ліміт SMTP: %s", e)
+                report_redis_error()
+
+        return cls._try_acquire_local(buckets, now_ms) / 1000.0
+
+    @classmethod
+    def acquire(
+        cls,
+        recipients: int,
+        messages: int = 1,
+        max_wait: Optional[float] = None,
+    ) -> None:
+        """Дочекатися токенів або підняти RateLimitExceeded"""
+        if max_wait is None:
+            max_wait = current_app.config.get("SMTP_RATE_MAX_WAIT", 30)
+
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = cls.try_acquire(recipients, messages)
+            if wait <= 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExceeded(wait)
+            time.sleep(wait)
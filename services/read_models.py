@@ -0,0 +1,145 @@
+from datetime import date
+from typing import Iterator, List, NamedTuple
+
+from sqlalchemy import select
+
+from app import db
+from models import (
+    Employee,
+    Group,
+    GroupScope,
+    NotificationOptOut,
+    SuppressedAddress,
+    employee_groups,
+)
+
+# Розмір порції для потокового читання рядків з БД
+YIELD_PER = 500
+
+
+class EmployeeRow(NamedTuple):
+    """Легка проєкція співробітника (без ORM та identity map)"""
+
+    id: int
+    first_name: str
+    last_name: str
+    email: str
+    birth_date: date
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.first_name} {self.last_name}"
+
+
+class EmployeeChoice(NamedTuple):
+    """Мінімальна проєкція співробітника для випадаючих списків"""
+
+    id: int
+    first_name: str
+    last_name: str
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.first_name} {self.last_name}"
+
+
+class EmployeeReadModel:
+    """Read-модель співробітників для read-heavy шляхів"""
+
+    @staticmethod
+    def iter_employees(
+        *criteria, order_by=(), yield_per: int = YIELD_PER
+    ) -> Iterator[EmployeeRow]:
+        """Потоково отримати співробітників як легкі рядки"""
+        stmt = (
+            select(
+                Employee.id,
+                Employee.first_name,
+                Employee.last_name,
+                Employee.email,
+                Employee.birth_date,
+            )
+            .where(*criteria)
+            .order_by(*order_by)
+            .execution_options(yield_per=yield_per)
+        )
+        for row in db.session.execute(stmt):
+            yield EmployeeRow._make(row)
+
+    @staticmethod
+    def iter_emails(
+        *criteria, yield_per: int = YIELD_PER
+    ) -> Iterator[str]:
+        """Потоково отримати лише email адреси співробітників"""
+        stmt = (
+            select(Employee.email)
+            .where(*criteria)
+            .execution_options(yield_per=yield_per)
+        )
+        yield from db.session.scalars(stmt)
+
+    @staticmethod
+    def get_recipient_emails(employee_id: int) -> List[str]:
+        """Отримати email адреси отримувачів повідомлення про іменинника"""
+        # Області сповіщень груп іменинника (пошук за PK employee_groups)
+        scopes = db.session.execute(
+            select(employee_groups.c.group_id, Group.notification_scope)
+            .join(Group, Group.id == employee_groups.c.group_id)
+            .where(employee_groups.c.employee_id == employee_id)
+        ).all()
+
+        # Ті, хто відмовився від усієї розсилки
+        opted_out = select(NotificationOptOut.employee_id).where(
+            NotificationOptOut.group_id.is_(None)
+        )
+        # Адреси з постійними відмовами доставки (унікальний індекс за email)
+        suppressed = select(SuppressedAddress.email).where(
+            SuppressedAddress.suppressed.is_(True)
+        )
+
+        # Без груп або з груповою областю "компанія" — усі крім іменинника
+        if not scopes or any(
+            scope == GroupScope.COMPANY for _, scope in scopes
+        ):
+            return list(
+                EmployeeReadModel.iter_emails(
+                    Employee.id != employee_id,
+                    Employee.id.not_in(opted_out),
+                    Employee.email.not_in(suppressed),
+                )
+            )
+
+        # Інакше — лише колеги з тих самих груп (індекс за group_id),
+        # крім тих, хто відмовився від розсилки саме цієї групи
+        colleagues = (
+            select(employee_groups.c.employee_id)
+            .where(
+                employee_groups.c.group_id.in_(
+                    [group_id for group_id, _ in scopes]
+                ),
+                ~select(NotificationOptOut.id)
+                .where(
+                    NotificationOptOut.employee_id
+                    == employee_groups.c.employee_id,
+                    NotificationOptOut.group_id == employee_groups.c.group_id,
+                )
+                .exists(),
+            )
+            .distinct()
+        )
+        return list(
+            EmployeeReadModel.iter_emails(
+                Employee.id.in_(colleagues),
+                Employee.id != employee_id,
+                Employee.id.not_in(opted_out),
+                Employee.email.not_in(suppressed),
+            )
+        )
+
+    @staticmethod
+    def list_choices() -> List[EmployeeChoice]:
+        """Отримати список співробітників для вибору, впорядкований за ім'ям"""
+        stmt = select(
+            Employee.id, Employee.first_name, Employee.last_name
+        ).order_by(Employee.first_name, Employee.last_name)
+        return [EmployeeChoice._make(row) for row in db.session.execute(stmt)]
@@ -0,0 +1,161 @@
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+import pytz
+from flask import current_app
+
+from app import db
+from models import Employee, EmployeeSchedule
+from services.email_service import EmailService
+from services.read_models import EmployeeReadModel, EmployeeRow
+
+# Області щоденних запусків: усі співробітники (одна зона з конфігу)
+# або співробітники без власної часової зони
+ALL_SCOPE = "all"
+DEFAULT_SCOPE = "default"
+
+
+class ScheduleService:
+    """Планування нагадувань за часовими зонами співробітників"""
+
+    @staticmethod
+    def is_valid_timezone(name: Optional[str]) -> bool:
+        return not name or name in pytz.all_timezones_set
+
+    @staticmethod
+    def get_timezone(name: Optional[str]):
+        """Часова зона співробітника (None — з конфігу)"""
+        return pytz.timezone(name or current_app.config["TIMEZONE"])
+
+    @classmethod
+    def local_today(cls, name: Optional[str]) -> date:
+        return datetime.now(cls.get_timezone(name)).date()
+
+    @staticmethod
+    def next_notification_date(birth_date: date, today: date) -> date:
+        """Найближча дата нагадування, починаючи з today"""
+        # Для ДН на початку січня нагадування припадає на грудень
+        for year in (today.year, today.year + 1, today.year + 2):
+            notification_date = EmailService.get_notification_date(
+                birth_date, year
+            )
+            if notification_date >= today:
+                return notification_date
+        return notification_date
+
+    @classmethod
+    def update(cls, employee: Employee, timezone: Optional[str]) -> None:
+        """Оновити часову зону та дату нагадування співробітника. Без commit"""
+        schedule = employee.schedule or EmployeeSchedule()
+        schedule.timezone = timezone or None
+        schedule.notification_date = cls.next_notification_date(
+            employee.birth_date, cls.local_today(schedule.timezone)
+        )
+        employee.schedule = schedule
+
+    @classmethod
+    def insert_many(cls, rows: List[Tuple[int, date, Optional[str]]]) -> int:
+        """Створити розклад для нових співробітників (id, ДН, зона). Без commit"""
+        if not rows:
+            return 0
+        db.session.execute(
+            db.insert(EmployeeSchedule),
+            [
+                {
+                    "employee_id": employee_id,
+                    "timezone": timezone or None,
+                    "notification_date": cls.next_notification_date(
+                        birth_date, cls.local_today(timezone)
+                    ),
+                }
+                for employee_id, birth_date, timezone in rows
+            ],
+        )
+        return len(rows)
+
+    @classmethod
+    def ensure_all(cls) -> int:
+        """Створити розклад для співробітників, які його ще не мають. Без commit"""
+        missing = db.session.execute(
+            db.select(Employee.id, Employee.birth_date).where(
+                ~db.select(EmployeeSchedule.employee_id)
+                .where(EmployeeSchedule.employee_id == Employee.id)
+                .exists()
+            )
+        ).all()
+        return cls.insert_many(
+            [(employee_id, birth_date, None) for employee_id, birth_date in missing]
+        )
+
+    @staticmethod
+    def scope_for(timezone: Optional[str]) -> str:
+        """Область щоденного запуску для часової зони"""
+        return timezone or DEFAULT_SCOPE
+
+    @staticmethod
+    def in_scope(scope: str):
+        """Умова на часову зону (для індексу (timezone, notification_date))"""
+        if scope == ALL_SCOPE:
+            return db.true()
+        if scope == DEFAULT_SCOPE:
+            return EmployeeSchedule.timezone.is_(None)
+        return EmployeeSchedule.timezone == scope
+
+    @classmethod
+    def local_now_by_scope(
+        cls, now: Optional[datetime] = None
+    ) -> List[Tuple[str, datetime]]:
+        """Локальний час кожної часової зони, що є в розкладі"""
+        now = now or datetime.now(pytz.utc)
+        timezones = db.session.scalars(
+            db.select(EmployeeSchedule.timezone).distinct()
+        )
+        return [
+            (cls.scope_for(timezone), now.astimezone(cls.get_timezone(timezone)))
+            for timezone in timezones
+        ]
+
+    @classmethod
+    def due_employee_ids(cls, scope: str, local_date: date):
+        """Підзапит іменинників області, про яких треба нагадати в local_date"""
+        return db.select(EmployeeSchedule.employee_id).where(
+            cls.in_scope(scope),
+            EmployeeSchedule.notification_date == local_date,
+        )
+
+    @classmethod
+    def due_employees(cls, scope: str, local_date: date) -> List[EmployeeRow]:
+        return list(
+            EmployeeReadModel.iter_employees(
+                Employee.id.in_(cls.due_employee_ids(scope, local_date))
+            )
+        )
+
+    @classmethod
+    def roll_forward(cls, scope: str, local_date: date) -> int:
+        """Перенести оброблені та пропущені дати області на наступний рік. Без commit"""
+        rows = db.session.execute(
+            db.select(EmployeeSchedule.employee_id, Employee.birth_date)
+            .join(Employee, Employee.id == EmployeeSchedule.employee_id)
+            .where(
+                cls.in_scope(scope),
+                EmployeeSchedule.notification_date <= local_date,
+            )
+        ).all()
+        if not rows:
+            return 0
+
+        next_day = local_date + timedelta(days=1)
+        db.session.execute(
+            db.update(EmployeeSchedule),
+            [
+                {
+                    "employee_id": employee_id,
+                    "notification_date": cls.next_notification_date(
+                        birth_date, next_day
+                    ),
+                }
+                for employee_id, birth_date in rows
+            ],
+        )
+        return len(rows)
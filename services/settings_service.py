@@ -0,0 +1,188 @@
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict
+
+import redis
+from flask import current_app
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app import db, mail_state
+from models import AppSetting
+from utils.redis_client import get_redis, report_redis_error
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "bdaygo:settings:version"
+# Ключ версії в Redis — кеш: після закінчення береться з БД знову
+VERSION_TTL = 3600
+
+# Рядок-лічильник версій в app_settings (не налаштування)
+VERSION_ROW = "_version"
+
+# Кеш процесу: застосовані налаштування та їхня версія
+_cache: Dict[str, Any] = {"version": None, "values": {}}
+
+
+class SettingsService:
+    """Спільні налаштування в БД з версією та гарячим перезавантаженням"""
+
+    # Налаштування, які можна змінити з інтерфейсу, та їхні типи.
+    # MAIL_PASSWORD сюди не входить: секрет лишається в .env, а не в БД
+    FIELDS: Dict[str, Callable[[Any], Any]] = {
+        "MAIL_SERVER": str,
+        "MAIL_PORT": int,
+        "MAIL_USE_TLS": bool,
+        "MAIL_USE_SSL": bool,
+        "MAIL_USERNAME": str,
+        "MAIL_DEFAULT_SENDER": str,
+        "SMTP_PROVIDERS": list,
+        "EMAIL_SEND_TIME": int,
+        "EMAIL_PREPARE_TIME": int,
+        "RETRY_ATTEMPTS": int,
+        "RETRY_DELAY": int,
+    }
+
+    @staticmethod
+    def _db_version() -> int:
+        return db.session.scalar(
+            db.select(db.func.coalesce(db.func.max(AppSetting.version), 0))
+        )
+
+    @staticmethod
+    def _publish_version(version: int) -> None:
+        client = get_redis()
+        if client is None:
+            return
+        try:
+            client.set(VERSION_KEY, version, ex=VERSION_TTL)
+        except redis.RedisError:
+            report_redis_error()
+
+    @classmethod
+    def current_version(cls) -> int:
+        """Версія налаштувань: один GET у Redis, інакше max(version) з БД"""
+        client = get_redis()
+        if client is not None:
+            try:
+                version = client.get(VERSION_KEY)
+                if version is not None:
+                    return int(version)
+            except redis.RedisError:
+                report_redis_error()
+
+        version = cls._db_version()
+        cls._publish_version(version)
+        return version
+
+    @classmethod
+    def load(cls, force: bool = False) -> bool:
+        """Застосувати налаштування з БД до поточного app (True — змінилися)"""
+        app = current_app._get_current_object()
+        version = cls.current_version()
+        if force or version != _cache["version"]:
+            rows = db.session.execute(
+                db.select(AppSetting.key, AppSetting.value)
+            ).all()
+            _cache["values"] = {
+                key: cls.FIELDS[key](json.loads(value))
+                for key, value in rows
+                if key in cls.FIELDS
+            }
+            _cache["version"] = version
+
+        app.extensions["settings_checked_at"] = time.monotonic()
+        if not force and app.extensions.get("settings_version") == version:
+            return False
+
+        app.config.update(_cache["values"])
+        # Flask-Mail читає конфіг лише в init_app — перебудовуємо стан
+        # (якщо його ще немає, він створиться з першим листом)
+        if "mail" in app.extensions:
+            mail_state(app, rebuild=True)
+        app.extensions["settings_version"] = version
+        if version:
+            logger.info("Застосовано налаштування версії %d", version)
+        return True
+
+    @classmethod
+    def refresh(cls) -> bool:
+        """Перевірити версію не частіше ніж раз на SETTINGS_CHECK_INTERVAL"""
+        app = current_app._get_current_object()
+        checked_at = app.extensions.get("settings_checked_at", 0)
+        if time.monotonic() - checked_at < app.config["SETTINGS_CHECK_INTERVAL"]:
+            return False
+        try:
+            return cls.load()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            app.extensions["settings_checked_at"] = time.monotonic()
+            logger.warning(
+                "Не вдалося перевірити налаштування: %s", getattr(e, "orig", e)
+            )
+            return False
+
+    @classmethod
+    def _next_version(cls) -> int:
+        """Атомарно виділити номер версії (блокує лічильник до commit)
+
+        Паралельні збереження чекають одне на одного і отримують різні
+        версії, тож інші процеси не пропустять жодне з них.
+        """
+        for _ in range(3):
+            result = db.session.execute(
+                db.update(AppSetting)
+                .where(AppSetting.key == VERSION_ROW)
+                .values(
+                    version=AppSetting.version + 1,
+                    updated_at=datetime.utcnow(),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                return db.session.scalar(
+                    db.select(AppSetting.version).where(
+                        AppSetting.key == VERSION_ROW
+                    )
+                )
+            try:
+                # Перше збереження: лічильник продовжує наявні версії
+                version = cls._db_version() + 1
+                db.session.add(
+                    AppSetting(key=VERSION_ROW, value="null", version=version)
+                )
+                db.session.flush()
+                return version
+            except IntegrityError:
+                # Лічильник щойно створив інший процес — повторюємо UPDATE
+                db.session.rollback()
+        raise RuntimeError("Не вдалося виділити версію налаштувань")
+
+    @classmethod
+    def save(cls, values: Dict[str, Any]) -> int:
+        """Зберегти налаштування, підняти версію та застосувати тут же"""
+        version = cls._next_version()
+        existing = {
+            row.key: row
+            for row in AppSetting.query.filter(AppSetting.key.in_(values))
+        }
+        for key, value in values.items():
+            row = existing.get(key) or AppSetting(key=key)
+            row.value = json.dumps(cls.FIELDS[key](value))
+            row.version = version
+            row.updated_at = datetime.utcnow()
+            db.session.add(row)
+        # Ключі, яких більше немає у FIELDS (напр. MAIL_PASSWORD зі старих
+        # версій), не лишаються в БД
+        AppSetting.query.filter(
+            AppSetting.key.not_in([*cls.FIELDS, VERSION_ROW])
+        ).delete(synchronize_session=False)
+        db.session.commit()
+
+        # Інші процеси побачать нову версію під час наступної перевірки.
+        # Публікуємо найбільшу: паралельне збереження могло вже її підняти
+        cls._publish_version(cls._db_version())
+
+        cls.load(force=True)
+        return version
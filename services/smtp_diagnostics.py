@@ -0,0 +1,109 @@
+import smtplib
+import ssl
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Mapping, Optional
+
+from flask import current_app
+
+from app import mail_state
+
+if TYPE_CHECKING:
+    from flask_mail import Message
+
+# Таймаут кожної операції з сокетом (секунди)
+TIMEOUT = 30
+
+
+class SmtpProbeError(Exception):
+    """Помилка на одному з етапів SMTP-сесії"""
+
+    def __init__(self, stage: str, error: Exception, timings: Dict[str, float]):
+        super().__init__(f"{stage}: {error}")
+        self.stage = stage
+        self.error = error
+        self.timings = timings
+
+
+class SmtpDiagnostics:
+    """Тестовий лист з вимірюванням кожного етапу SMTP-сесії"""
+
+    @staticmethod
+    def build_message(email: str, sender: str) -> "Message":
+        from flask_mail import Message
+
+        mail_state(current_app._get_current_object())
+        return Message(
+            subject="Тестове повідомлення Birthday App",
+            recipients=[email],
+            body="Це тестове повідомлення для перевірки налаштувань SMTP.",
+            sender=sender,
+        )
+
+    @classmethod
+    def send_test_email(
+        cls,
+        email: str,
+        on_stage: Optional[Callable[[str, Dict[str, float]], None]] = None,
+        mail_config: Optional[Mapping[str, Any]] = None,
+    ) -> Dict[str, float]:
+        """Надіслати тестовий лист; повертає тривалість етапів (мс)
+
+        mail_config — налаштування MAIL_* провайдера пулу (None — з конфігу).
+        """
+        config = mail_config or current_app.config
+        msg = cls.build_message(email, config["MAIL_DEFAULT_SENDER"])
+        timings: Dict[str, float] = {}
+        smtp: Optional[smtplib.SMTP] = None
+
+        def run(stage: str, action: Callable[[], None]) -> None:
+            if on_stage is not None:
+                on_stage(stage, dict(timings))
+            started = time.perf_counter()
+            try:
+                action()
+            except Exception as e:
+                raise SmtpProbeError(stage, e, timings) from e
+            timings[stage] = round((time.perf_counter() - started) * 1000, 1)
+
+        def connect():
+            nonlocal smtp
+            if config["MAIL_USE_SSL"]:
+                smtp = smtplib.SMTP_SSL(
+                    config["MAIL_SERVER"], config["MAIL_PORT"], timeout=TIMEOUT
+                )
+            else:
+                smtp = smtplib.SMTP(
+                    config["MAIL_SERVER"], config["MAIL_PORT"], timeout=TIMEOUT
+                )
+            smtp.ehlo()
+
+        def starttls():
+            smtp.starttls(context=ssl.create_default_context())
+            smtp.ehlo()
+
+        try:
+            run("connect", connect)
+            if config["MAIL_USE_TLS"] and not config["MAIL_USE_SSL"]:
+                run("tls", starttls)
+            if config["MAIL_USERNAME"] and config["MAIL_PASSWORD"]:
+                run(
+                    "auth",
+                    lambda: smtp.login(
+                        config["MAIL_USERNAME"], config["MAIL_PASSWORD"]
+                    ),
+                )
+            run(
+                "send",
+                lambda: smtp.sendmail(
+                    msg.sender, msg.send_to, msg.as_bytes()
+                ),
+            )
+        finally:
+            if smtp is not None:
+                try:
+                    smtp.quit()
+                except (smtplib.SMTPException, OSError):
+                    pass
+
+        timings["total"] = round(sum(timings.values()), 1)
+        return timings
@@ -0,0 +1,286 @@
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+
+import redis
+from flask import current_app
+
+from app import mail_state
+from services.circuit_breaker import SmtpCircuitBreaker
+from services.rate_limiter import BUDGETS, RateLimitExceeded, SmtpRateLimiter
+from utils.redis_client import get_redis, report_redis_error
+
+logger = logging.getLogger(__name__)
+
+# Налаштування провайдера -> ключ конфігу Flask-Mail
+MAIL_KEYS = {
+    "server": "MAIL_SERVER",
+    "port": "MAIL_PORT",
+    "use_tls": "MAIL_USE_TLS",
+    "use_ssl": "MAIL_USE_SSL",
+    "username": "MAIL_USERNAME",
+    "password": "MAIL_PASSWORD",
+}
+
+
+class SmtpProvider(NamedTuple):
+    """SMTP релей пулу"""
+
+    name: str
+    weight: float
+    # Області лімітера та запобіжника (None — спільні, як без пулу)
+    scope: Optional[str]
+    mail_config: Optional[Dict[str, Any]]  # None — поточний стан Flask-Mail
+    limits: Optional[Dict[str, int]]  # None — квоти SMTP_MAX_* з конфігу
+
+
+class SmtpStats:
+    """Погодинні лічильники провайдерів: листи, помилки, сумарна затримка"""
+
+    KEY_PREFIX = "bdaygo:smtp:stats:"
+    TTL = 2 * 24 * 3600
+
+    # Локальний стан: (провайдер, година) -> лічильники
+    _local: Dict[tuple, Dict[str, float]] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _hour(moment: datetime) -> str:
+        return moment.strftime("%Y%m%d%H")
+
+    @classmethod
+    def record(
+        cls, name: str, sent: int = 0, errors: int = 0, latency_ms: float = 0
+    ) -> None:
+        hour = cls._hour(datetime.utcnow())
+        client = get_redis()
+        if client is not None:
+            try:
+                key = f"{cls.KEY_PREFIX}{name}:{hour}"
+                pipe = client.pipeline()
+                pipe.hincrby(key, "sent", sent)
+                pipe.hincrby(key, "errors", errors)
+                pipe.hincrbyfloat(key, "latency_ms", latency_ms)
+                pipe.expire(key, cls.TTL)
+                pipe.execute()
+                return
+            except redis.RedisError:
+                report_redis_error()
+
+        with cls._lock:
+            counters = cls._local.setdefault(
+                (name, hour), {"sent": 0, "errors": 0, "latency_ms": 0.0}
+            )
+            counters["sent"] += sent
+            counters["errors"] += errors
+            counters["latency_ms"] += latency_ms
+
+    @classmethod
+    def summary(cls, name: str, hours: int = 24) -> Dict[str, Any]:
+        """Лічильники провайдера за останні hours годин"""
+        now = datetime.utcnow()
+        hour_keys = [
+            cls._hour(now - timedelta(hours=offset)) for offset in range(hours)
+        ]
+        totals = {"sent": 0, "errors": 0, "latency_ms": 0.0}
+
+        client = get_redis()
+        rows = None
+        if client is not None:
+            try:
+                pipe = client.pipeline()
+                for hour in hour_keys:
+                    pipe.hgetall(f"{cls.KEY_PREFIX}{name}:{hour}")
+                rows = [
+                    {key.decode(): float(value) for key, value in row.items()}
+                    for row in pipe.execute()
+                ]
+            except redis.RedisError:
+                report_redis_error()
+        if rows is None:
+            with cls._lock:
+                rows = [dict(cls._local.get((name, hour), {})) for hour in hour_keys]
+
+        for row in rows:
+            for key in totals:
+                totals[key] += row.get(key, 0)
+
+        attempts = totals["sent"] + totals["errors"]
+        return {
+            "sent": int(totals["sent"]),
+            "errors": int(totals["errors"]),
+            "error_rate": round(totals["errors"] / attempts, 4) if attempts else 0,
+            "avg_latency_ms": (
+                round(totals["latency_ms"] / totals["sent"], 1)
+                if totals["sent"]
+                else None
+            ),
+        }
+
+
+class SmtpPool:
+    """Пул SMTP провайдерів: вибір за вагою, квоти та стан кожного
+
+    Екземпляр живе один пакет доставки і тримає відкриті з'єднання.
+    """
+
+    def __init__(self):
+        self.providers = self.get_providers()
+        self.connections: Dict[str, Any] = {}  # провайдер -> з'єднання
+        self.allowed: Set[str] = set()  # запобіжник уже пропустив
+        self.down: Set[str] = set()  # впали в цьому пакеті
+
+    @staticmethod
+    def get_providers() -> List[SmtpProvider]:
+        """Провайдери з SMTP_PROVIDERS або один — з налаштувань MAIL_*"""
+        config = current_app.config
+        providers = []
+        for index, item in enumerate(config.get("SMTP_PROVIDERS") or []):
+            name = str(item.get("name") or f"smtp{index + 1}")
+            mail_config = {"MAIL_DEFAULT_SENDER": config["MAIL_DEFAULT_SENDER"]}
+            for field, key in MAIL_KEYS.items():
+                mail_config[key] = item.get(field, config.get(key))
+            limits = {
+                key: item.get(key[len("SMTP_"):].lower(), 0)
+                for _, key, _ in BUDGETS
+            }
+            providers.append(
+                SmtpProvider(
+                    name=name,
+                    weight=float(item.get("weight", 1)),
+                    scope=f"provider:{name}",
+                    mail_config=mail_config,
+                    limits=limits,
+                )
+            )
+
+        if not providers:
+            providers.append(SmtpProvider("default", 1.0, None, None, None))
+        return [provider for provider in providers if provider.weight > 0]
+
+    @classmethod
+    def retry_after(cls) -> float:
+        """0, якщо хоч один провайдер доступний, інакше секунди до проби"""
+        waits = [
+            SmtpCircuitBreaker.retry_after(provider.scope)
+            for provider in cls.get_providers()
+        ]
+        return min(waits, default=0.0)
+
+    @classmethod
+    def status(cls) -> List[Dict[str, Any]]:
+        """Стан провайдерів для інтерфейсу"""
+        result = []
+        for provider in cls.get_providers():
+            retry_after = SmtpCircuitBreaker.retry_after(provider.scope)
+            config = provider.mail_config or current_app.config
+            result.append(
+                {
+                    "name": provider.name,
+                    "server": config.get("MAIL_SERVER"),
+                    "weight": provider.weight,
+                    "healthy": retry_after == 0,
+                    "retry_after": round(retry_after),
+                    "last_24h": SmtpStats.summary(provider.name),
+                }
+            )
+        return result
+
+    def _ordered(self, exclude: Set[str]) -> List[SmtpProvider]:
+        """Зважений випадковий порядок (Efraimidis–Spirakis)"""
+        candidates = [
+            provider
+            for provider in self.providers
+            if provider.name not in exclude and provider.name not in self.down
+        ]
+        return sorted(
+            candidates,
+            key=lambda provider: random.random() ** (1.0 / provider.weight),
+            reverse=True,
+        )
+
+    def _is_allowed(self, provider: SmtpProvider) -> bool:
+        if provider.name in self.allowed:
+            return True
+        if SmtpCircuitBreaker.allow_request(provider.scope):
+            self.allowed.add(provider.name)
+            return True
+        return False
+
+    def acquire(
+        self,
+        recipients: int,
+        messages: int = 1,
+        exclude: Optional[Set[str]] = None,
+        max_wait: Optional[float] = None,
+    ) -> Optional[SmtpProvider]:
+        """Вибрати провайдера з доступною квотою
+
+        None — жоден провайдер не доступний; RateLimitExceeded — квоти
+        всіх доступних вичерпані довше, ніж дозволено чекати.
+        """
+        if max_wait is None:
+            max_wait = current_app.config.get("SMTP_RATE_MAX_WAIT", 30)
+        exclude = exclude or set()
+
+        deadline = time.monotonic() + max_wait
+        while True:
+            shortest = None
+            for provider in self._ordered(exclude):
+                if not self._is_allowed(provider):
+                    continue
+                wait = SmtpRateLimiter.try_acquire(
+                    recipients, messages, provider.scope, provider.limits
+                )
+                if wait <= 0:
+                    return provider
+                shortest = wait if shortest is None else min(shortest, wait)
+
+            if shortest is None:
+                return None
+            if time.monotonic() + shortest > deadline:
+                raise RateLimitExceeded(shortest)
+            time.sleep(shortest)
+
+    def connect(self, provider: SmtpProvider):
+        """Відкрите з'єднання з провайдером (одне на пакет)"""
+        connection = self.connections.get(provider.name)
+        if connection is None:
+            from flask_mail import Connection, Mail
+
+            app = current_app._get_current_object()
+            if provider.mail_config is None:
+                connection = Connection(mail_state(app))
+            else:
+                connection = Connection(
+                    Mail().init_mail(
+                        provider.mail_config, app.debug, app.testing
+                    )
+                )
+            connection.__enter__()
+            self.connections[provider.name] = connection
+        return connection
+
+    def mark_down(self, provider: SmtpProvider, error: Exception) -> None:
+        """Помилка транспорту: провайдер виключається до кінця пакета"""
+        SmtpCircuitBreaker.record_failure(provider.scope)
+        self.down.add(provider.name)
+        self.allowed.discard(provider.name)
+        connection = self.connections.pop(provider.name, None)
+        if connection is not None:
+            try:
+                connection.__exit__(None, None, None)
+            except Exception:
+                pass
+        logger.warning("SMTP провайдер %s недоступний: %s", provider.name, error)
+
+    def close(self) -> None:
+        for connection in self.connections.values():
+            try:
+                connection.__exit__(None, None, None)
+            except Exception:
+                pass
+        self.connections.clear()
@@ -0,0 +1,172 @@
+import re
+from datetime import date
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from models import EmailTemplate
+
+PLACEHOLDER_REGEX = re.compile(r"\{(\w+)\}")
+
+# Роздільник розділів у тілі дайджесту
+DIGEST_SEPARATOR = "\n\n" + "—" * 20 + "\n\n"
+
+WEEKDAYS = (
+    "понеділок",
+    "вівторок",
+    "середа",
+    "четвер",
+    "п'ятниця",
+    "субота",
+    "неділя",
+)
+
+
+class CompiledTemplate:
+    """Шаблон, розібраний один раз на літерали та плейсхолдери"""
+
+    __slots__ = ("_parts", "_slots", "fields")
+
+    def __init__(self, text: str):
+        # re.split з групою повертає [літерал, поле, літерал, поле, ...]
+        chunks = PLACEHOLDER_REGEX.split(text)
+        self._parts: List[str] = []
+        self._slots: List[Tuple[int, str]] = []
+
+        for index, chunk in enumerate(chunks):
+            if index % 2:
+                self._slots.append((len(self._parts), chunk))
+                self._parts.append("{" + chunk + "}")
+            elif chunk:
+                self._parts.append(chunk)
+
+        self.fields = frozenset(field for _, field in self._slots)
+
+    def render(self, context: Dict[str, str]) -> str:
+        """Підставити значення одним join; невідомі плейсхолдери лишаються як є"""
+        pieces = self._parts.copy()
+        for index, field in self._slots:
+            value = context.get(field)
+            if value is not None:
+                pieces[index] = value
+        return "".join(pieces)
+
+
+@lru_cache(maxsize=256)
+def compile_text(text: str) -> CompiledTemplate:
+    """Скомпілювати довільний текст шаблону (з кешем за вмістом)"""
+    return CompiledTemplate(text)
+
+
+def next_birthday(birth_date: date, today: date) -> date:
+    """Найближча дата ДН, починаючи з today"""
+    for year in (today.year, today.year + 1):
+        try:
+            birthday = birth_date.replace(year=year)
+        except ValueError:  # 29 лютого
+            birthday = birth_date.replace(year=year, day=28)
+        if birthday >= today:
+            return birthday
+    return birthday
+
+
+def build_context(employee: Any, today: Optional[date] = None) -> Dict[str, str]:
+    """Значення плейсхолдерів для конкретного співробітника"""
+    today = today or date.today()
+    birthday = next_birthday(employee.birth_date, today)
+    return {
+        "name": employee.full_name,
+        "first_name": employee.first_name,
+        "date": birthday.strftime("%d.%m.%Y"),
+        "age": str(birthday.year - employee.birth_date.year),
+        "days_until": str((birthday - today).days),
+        "weekday": WEEKDAYS[birthday.weekday()],
+    }
+
+
+class TemplateRenderer:
+    """Рендеринг шаблонів листів з кешем скомпільованих форм"""
+
+    # template_id -> (мітка змін, тема, тіло)
+    _cache: Dict[int, Tuple[int, CompiledTemplate, CompiledTemplate]] = {}
+
+    @classmethod
+    def compile(
+        cls, template: EmailTemplate
+    ) -> Tuple[CompiledTemplate, CompiledTemplate]:
+        """Отримати скомпільовані тему та тіло шаблону"""
+        # Мітка змін — хеш вмісту: будь-яке редагування інвалідовує кеш
+        stamp = hash((template.subject, template.template_text))
+        cached = cls._cache.get(template.id)
+        if cached is None or cached[0] != stamp:
+            cached = (
+                stamp,
+                CompiledTemplate(template.subject),
+                CompiledTemplate(template.template_text),
+            )
+            cls._cache[template.id] = cached
+        return cached[1], cached[2]
+
+    @classmethod
+    def render(
+        cls,
+        template: EmailTemplate,
+        employee: Any,
+        today: Optional[date] = None,
+        extra: Optional[Dict[str, str]] = None,
+    ) -> Tuple[str, str]:
+        """Відрендерити тему та тіло листа для співробітника"""
+        subject, body = cls.compile(template)
+        context = build_context(employee, today)
+        if extra:
+            context.update(extra)
+        return subject.render(context), body.render(context)
+
+    @classmethod
+    def render_digest(
+        cls,
+        template: EmailTemplate,
+        employees: List[Any],
+        today: Optional[date] = None,
+        extra: Optional[Dict[str, str]] = None,
+    ) -> Tuple[str, str]:
+        """Відрендерити один лист про кількох іменинників"""
+        if len(employees) == 1:
+            return cls.render(template, employees[0], today, extra)
+
+        subject, body = cls.compile(template)
+        today = today or date.today()
+        contexts = [build_context(employee, today) for employee in employees]
+        if extra:
+            for context in contexts:
+                context.update(extra)
+
+        # Тема — з переліком значень через кому, тіло — розділ на кожного
+        combined = {
+            key: ", ".join(context[key] for context in contexts)
+            for key in contexts[0]
+        }
+        return subject.render(combined), DIGEST_SEPARATOR.join(
+            body.render(context) for context in contexts
+        )
+
+    @classmethod
+    def render_many(
+        cls,
+        template: EmailTemplate,
+        employees: Iterable[Any],
+        today: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """Відрендерити шаблон для багатьох співробітників за один прохід"""
+        subject, body = cls.compile(template)
+        today = today or date.today()
+        rendered = []
+        for employee in employees:
+            context = build_context(employee, today)
+            rendered.append(
+                {
+                    "employee": employee,
+                    "subject": subject.render(context),
+                    "body": body.render(context),
+                }
+            )
+        return rendered
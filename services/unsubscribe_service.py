@@ -0,0 +1,136 @@
+from email import message_from_bytes, policy
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+
+from app import db
+from models import Employee, Group, NotificationOptOut, employee_groups
+
+# Мітка посилання у підготовленому листі; замінюється при доставці
+UNSUBSCRIBE_MARKER = "__UNSUBSCRIBE_URL__"
+
+# Без перенесення рядків: довге посилання в заголовку лишається як є
+UNFOLDED = policy.SMTP.clone(max_line_length=None)
+
+UNSUBSCRIBE_FOOTER = "\n\n--\nВідписатися від розсилки: {unsubscribe_url}"
+
+
+class UnsubscribeService:
+    """Налаштування розсилки співробітників та підписані посилання відписки"""
+
+    SALT = "unsubscribe"
+
+    @staticmethod
+    def enabled() -> bool:
+        return bool(current_app.config["EMAIL_UNSUBSCRIBE_LINKS"])
+
+    @classmethod
+    def render_context(cls) -> Optional[Dict[str, str]]:
+        """Додаткові плейсхолдери шаблону ({unsubscribe_url} — мітка)"""
+        if not cls.enabled():
+            return None
+        return {"unsubscribe_url": UNSUBSCRIBE_MARKER}
+
+    @classmethod
+    def _serializer(cls) -> URLSafeSerializer:
+        return URLSafeSerializer(current_app.config["SECRET_KEY"], salt=cls.SALT)
+
+    @classmethod
+    def make_token(cls, email: str) -> str:
+        """Підписаний токен для email отримувача"""
+        return cls._serializer().dumps(email.lower())
+
+    @classmethod
+    def load_token(cls, token: str) -> Optional[str]:
+        """Email з токена (None, якщо підпис некоректний)"""
+        try:
+            return cls._serializer().loads(token)
+        except BadSignature:
+            return None
+
+    @classmethod
+    def build_url(cls, email: str) -> str:
+        """Абсолютне посилання відписки (працює і поза запитом, у Celery)"""
+        base_url = current_app.config["APP_BASE_URL"].rstrip("/")
+        return f"{base_url}/unsubscribe/{cls.make_token(email)}"
+
+    @staticmethod
+    def personalize(
+        payload: bytes, recipients: List[str]
+    ) -> Iterator[Tuple[List[str], bytes]]:
+        """Розбити підготовлений лист на копії з посиланням кожного отримувача"""
+        if UNSUBSCRIBE_MARKER.encode() not in payload:
+            yield recipients, payload
+            return
+
+        for email in recipients:
+            url = UnsubscribeService.build_url(email)
+            msg = message_from_bytes(payload, policy=policy.SMTP)
+            msg.replace_header("List-Unsubscribe", f"<{url}>")
+
+            # Тіло може бути в base64, тому замінюємо в декодованому тексті
+            body = msg.get_body(("plain",))
+            if body is not None:
+                body.set_content(
+                    body.get_content().replace(UNSUBSCRIBE_MARKER, url),
+                    charset="utf-8",
+                )
+            yield [email], msg.as_bytes(policy=UNFOLDED)
+
+    @staticmethod
+    def get_employee_by_email(email: str) -> Optional[Employee]:
+        return Employee.query.filter(
+            db.func.lower(Employee.email) == email.lower()
+        ).first()
+
+    @staticmethod
+    def get_preferences(employee: Employee) -> dict:
+        """Поточні налаштування розсилки співробітника"""
+        group_ids = db.session.scalars(
+            db.select(NotificationOptOut.group_id).where(
+                NotificationOptOut.employee_id == employee.id
+            )
+        ).all()
+        groups = db.session.execute(
+            db.select(Group.id, Group.name)
+            .join(employee_groups, employee_groups.c.group_id == Group.id)
+            .where(employee_groups.c.employee_id == employee.id)
+            .order_by(Group.name)
+        ).all()
+        return {
+            "opted_out": None in group_ids,
+            "opted_out_groups": sorted(
+                group_id for group_id in group_ids if group_id is not None
+            ),
+            "groups": [{"id": id, "name": name} for id, name in groups],
+        }
+
+    @staticmethod
+    def set_preferences(
+        employee: Employee, opted_out: bool, group_ids: List[int]
+    ) -> None:
+        """Замінити налаштування розсилки співробітника. Без commit"""
+        member_of = set(
+            db.session.scalars(
+                db.select(employee_groups.c.group_id).where(
+                    employee_groups.c.employee_id == employee.id
+                )
+            )
+        )
+        wanted = {None} if opted_out else set()
+        wanted.update(group_id for group_id in group_ids if group_id in member_of)
+
+        db.session.execute(
+            db.delete(NotificationOptOut).where(
+                NotificationOptOut.employee_id == employee.id
+            )
+        )
+        if wanted:
+            db.session.execute(
+                db.insert(NotificationOptOut),
+                [
+                    {"employee_id": employee.id, "group_id": group_id}
+                    for group_id in wanted
+                ],
+            )
@@ -1,8 +1,18 @@
-from typing import Dict, Any, List
+import base64
+from typing import Dict, Any, List, Optional
 
-from datetime import date
+from datetime import date, timedelta
 
 from services.email_service import EmailService
+from services.outbox_service import OutboxService
+from services.bounce_service import BounceService
+from services.daily_run_service import DailyRunService
+from services.import_service import EmployeeImportError, EmployeeImportService
+from services.rate_limiter import RateLimitExceeded
+from services.settings_service import SettingsService
+from services.smtp_diagnostics import SmtpDiagnostics, SmtpProbeError
+from services.smtp_pool import SmtpPool
+from utils.task_lock import singleton_task
 from models import EmailTemplate
 from app import create_app, celery
 import logging
@@ -11,18 +21,32 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Один lean-додаток на процес воркера (пул з'єднань з БД спільний)
+_app = None
+
+
+def get_app():
+    """Flask-додаток для задач зі свіжими налаштуваннями з БД"""
+    global _app
+    if _app is None:
+        _app = create_app(lean=True)
+    # Перший виклик завантажує налаштування (lean-додаток їх не читає)
+    with _app.app_context():
+        SettingsService.refresh()
+    return _app
+
 
 @celery.task
+@singleton_task("daily-run")
 def send_daily_birthday_notifications() -> List[Dict[str, Any]] | str:
     """Щоденна задача для відправки повідомлень про ДН"""
 
-    app = create_app()
+    app = get_app()
 
     with app.app_context():
         try:
             today = date.today()
             logger.info("Запуск щоденної перевірки ДН %s", today)
-            email_service = EmailService()
 
             # Отримати активний шаблон
             active_template = EmailTemplate.query.filter_by(
@@ -34,41 +58,35 @@ def send_daily_birthday_notifications() -> List[Dict[str, Any]] | str:
                 )
                 return "Не знайдено активного шаблону"
 
-            # Отримати співробітників для повідомлення про їх ДН
-            employees_to_notify = email_service.get_employees_for_notification(
-                today
-            )
+            # Листи, підготовлені напередодні, вже в черзі; додаємо решту.
+            # Запуск виконується один раз на дату, пропущені дні доганяються
+            runs = DailyRunService.run_daily(active_template)
+            if not runs:
+                logger.info("Запуск на %s вже виконано", today)
+            for run_date, queued in runs.items():
+                logger.info("Листів у черзі на %s: %d", run_date, queued)
 
-            if not employees_to_notify:
+            # Доставка пакетами з outbox
+            results = OutboxService.deliver_pending()
+
+            if not results:
                 logger.info("Немає найближчих ДН для нагадування")
                 return "Немає найближчих ДН для нагадування"
 
-            results = []
-            for employee in employees_to_notify:
-                success, message = email_service.send_birthday_notification(
-                    employee, active_template
-                )
-
-                if success:
+            for result in results:
+                result.pop("employee_id")
+                if result["success"]:
                     logger.info(
                         "Успішно відправлено нагадування про ДН %s",
-                        employee.full_name,
+                        result["employee"],
                     )
                 else:
                     logger.error(
                         "Помилка відправки нагадування про ДН %s: %s",
-                        employee.full_name,
-                        message,
+                        result["employee"],
+                        result["message"],
                     )
 
-                results.append(
-                    {
-                        "employee": employee.full_name,
-                        "success": success,
-                        "message": message,
-                    }
-                )
-
             return results
 
         except Exception as e:
@@ -78,11 +96,257 @@ def send_daily_birthday_notifications() -> List[Dict[str, Any]] | str:
             return f"Помилка: {str(e)}"
 
 
+@celery.task
+@singleton_task("daily-run")
+def plan_timezone_notifications() -> str:
+    """Погодинний планувальник: розсилка для зон, де настав час відправки"""
+
+    app = get_app()
+
+    with app.app_context():
+        try:
+            active_template = EmailTemplate.query.filter_by(
+                is_active=True
+            ).first()
+            if not active_template:
+                logger.warning("Не знайдено активного шаблону листа")
+                return "Не знайдено активного шаблону"
+
+            runs = DailyRunService.plan_timezones(active_template)
+            for (scope, run_date), count in runs.items():
+                logger.info("Зона %s, %s: листів у черзі %d", scope, run_date, count)
+            queued = sum(runs.values())
+
+            results = OutboxService.deliver_pending()
+            return f"У черзі: {queued}, оброблено листів: {len(results)}"
+
+        except Exception as e:
+            logger.error(
+                "Помилка планувальника часових зон: %s", str(e), exc_info=True
+            )
+            return f"Помилка: {str(e)}"
+
+
+@celery.task
+@singleton_task("daily-run")
+def catch_up_daily_runs() -> str:
+    """Догнати пропущені щоденні запуски (викликається під час старту)"""
+
+    app = get_app()
+
+    with app.app_context():
+        try:
+            active_template = EmailTemplate.query.filter_by(
+                is_active=True
+            ).first()
+            if not active_template:
+                return "Не знайдено активного шаблону"
+
+            queued = DailyRunService.catch_up(active_template)
+            if queued:
+                OutboxService.deliver_pending()
+            return f"Догнано листів: {queued}"
+
+        except Exception as e:
+            logger.error(
+                "Помилка догону пропущених запусків: %s", str(e), exc_info=True
+            )
+            return f"Помилка: {str(e)}"
+
+
+@celery.task
+@singleton_task("outbox-sweep")
+def deliver_outbox() -> str:
+    """Обробник outbox: доставка листів, що настав час відправити"""
+
+    app = get_app()
+
+    with app.app_context():
+        try:
+            results = OutboxService.deliver_pending()
+            if results:
+                sent = sum(1 for result in results if result["success"])
+                logger.info(
+                    "Outbox: відправлено %d, помилок %d",
+                    sent,
+                    len(results) - sent,
+                )
+            return f"Оброблено листів: {len(results)}"
+
+        except Exception as e:
+            logger.error("Помилка доставки outbox: %s", str(e), exc_info=True)
+            return f"Помилка: {str(e)}"
+
+
+@celery.task
+@singleton_task("daily-prepare")
+def prepare_daily_birthday_notifications() -> str:
+    """Підготувати листи на наступний день (render-ahead)"""
+
+    app = get_app()
+
+    with app.app_context():
+        try:
+            send_date = date.today() + timedelta(days=1)
+            logger.info("Підготовка листів на %s", send_date)
+
+            active_template = EmailTemplate.query.filter_by(
+                is_active=True
+            ).first()
+            if not active_template:
+                logger.warning("Не знайдено активного шаблону листа")
+                return "Не знайдено активного шаблону"
+
+            prepared = EmailService().prepare_notifications(
+                send_date, active_template
+            )
+            logger.info("Підготовлено листів: %d", prepared)
+            return f"Підготовлено листів: {prepared}"
+
+        except Exception as e:
+            logger.error(
+                "Помилка підготовки листів: %s", str(e), exc_info=True
+            )
+            return f"Помилка: {str(e)}"
+
+
+@celery.task
+@singleton_task("bounce-processing")
+def process_bounces() -> str:
+    """Обробити листи-відмови зі скриньки BOUNCE_MAILBOX_PATH"""
+
+    app = get_app()
+
+    with app.app_context():
+        path = app.config["BOUNCE_MAILBOX_PATH"]
+        if not path:
+            return "BOUNCE_MAILBOX_PATH не налаштовано"
+
+        try:
+            stats = BounceService.process_mailbox(path)
+            logger.info(
+                "Відмови: %d (нових виключених адрес: %d)",
+                stats["bounces"],
+                stats["suppressed"],
+            )
+            return f"Оброблено відмов: {stats['bounces']}"
+
+        except Exception as e:
+            logger.error(
+                "Помилка обробки відмов: %s", str(e), exc_info=True
+            )
+            return f"Помилка: {str(e)}"
+
+
+# Черга вказана в самій задачі: її ставить у чергу веб, а не воркер
+@celery.task(queue="import", priority=9)
+def import_employees_file(filename: str, content: str) -> Dict[str, Any]:
+    """Імпорт співробітників з CSV/Excel (content — вміст у base64)"""
+
+    app = get_app()
+
+    with app.app_context():
+        try:
+            result = EmployeeImportService.run(
+                filename, base64.b64decode(content)
+            )
+            logger.info(
+                "Імпорт %s: створено %d, помилок %d",
+                filename,
+                result["created_count"],
+                result["total_errors"],
+            )
+            return result
+
+        except EmployeeImportError as e:
+            logger.warning("Імпорт %s: %s", filename, e)
+            return {"error": str(e)}
+
+
+# Черга вказана в самій задачі: її ставить у чергу веб, а не воркер
+@celery.task(bind=True, queue="interactive", priority=0)
+def send_test_email(
+    self, email: str, provider_name: Optional[str] = None
+) -> Dict[str, Any]:
+    """Тестовий лист через пул SMTP з вимірюванням етапів сесії
+
+    Провайдер обирається так само, як для розсилки (вага, квоти,
+    запобіжник); provider_name — перевірити конкретного.
+    """
+
+    app = get_app()
+
+    with app.app_context():
+
+        def on_stage(stage: str, timings: Dict[str, float]) -> None:
+            self.update_state(
+                state="PROGRESS",
+                meta={
+                    "provider": provider.name,
+                    "stage": stage,
+                    "timings": timings,
+                },
+            )
+
+        pool = SmtpPool()
+        names = {item.name for item in pool.providers}
+        if provider_name and provider_name not in names:
+            return {
+                "success": False,
+                "stage": "provider",
+                "error": f"Невідомий SMTP провайдер: {provider_name}",
+            }
+
+        try:
+            provider = pool.acquire(
+                recipients=1,
+                exclude=names - {provider_name} if provider_name else None,
+            )
+        except RateLimitExceeded as e:
+            return {"success": False, "stage": "rate_limit", "error": str(e)}
+
+        if provider is None:
+            return {
+                "success": False,
+                "stage": "unavailable",
+                "error": "SMTP провайдер тимчасово вимкнено запобіжником",
+            }
+
+        try:
+            timings = SmtpDiagnostics.send_test_email(
+                email, on_stage, provider.mail_config
+            )
+            logger.info(
+                "Тестовий лист на %s через %s: %s",
+                email,
+                provider.name,
+                timings,
+            )
+            return {
+                "success": True,
+                "provider": provider.name,
+                "timings": timings,
+            }
+
+        except SmtpProbeError as e:
+            logger.warning(
+                "Тестовий лист на %s через %s: %s", email, provider.name, e
+            )
+            return {
+                "success": False,
+                "provider": provider.name,
+                "stage": e.stage,
+                "error": str(e.error),
+                "timings": e.timings,
+            }
+
+
 @celery.task(bind=True, max_retries=1)
+@singleton_task("retry-email:{employee_id}")
 def retry_failed_email(self, employee_id: int, template_id: int) -> str:
     """Повторна спроба відправки email"""
 
-    app = create_app()
+    app = get_app()
 
     with app.app_context():
         try:
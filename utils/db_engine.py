@@ -0,0 +1,55 @@
+from typing import Any, Dict, Mapping
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+
+def build_engine_options(config: Mapping[str, Any]) -> Dict[str, Any]:
+    """Параметри рушія SQLAlchemy за типом БД (профілі SQLite / PostgreSQL)"""
+    backend = make_url(config["SQLALCHEMY_DATABASE_URI"]).get_backend_name()
+
+    if backend == "sqlite":
+        return {}  # налаштовується через PRAGMA, див. install_sqlite_pragmas
+
+    options: Dict[str, Any] = {
+        "pool_pre_ping": True,  # не віддавати з'єднання, розірване сервером
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+    }
+    if backend == "postgresql":
+        options.update(
+            pool_size=config["DB_POOL_SIZE"],
+            max_overflow=config["DB_MAX_OVERFLOW"],
+            pool_timeout=config["DB_POOL_TIMEOUT"],
+        )
+        timeout = config["DB_STATEMENT_TIMEOUT_MS"]
+        if timeout:
+            options["connect_args"] = {
+                "options": f"-c statement_timeout={timeout}"
+            }
+    return options
+
+
+def sqlite_pragmas(config: Mapping[str, Any]) -> Dict[str, Any]:
+    """PRAGMA для кожного з'єднання SQLite"""
+    pragmas: Dict[str, Any] = {
+        "busy_timeout": config["SQLITE_BUSY_TIMEOUT_MS"],
+        "mmap_size": config["SQLITE_MMAP_SIZE"],
+    }
+    if config["SQLITE_WAL"]:
+        # Читачі не блокують записувача і навпаки
+        pragmas["journal_mode"] = "WAL"
+        pragmas["synchronous"] = "NORMAL"
+    return pragmas
+
+
+def install_sqlite_pragmas(engine: Engine, pragmas: Mapping[str, Any]) -> None:
+    """Виконувати PRAGMA під час кожного нового з'єднання з SQLite"""
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
@@ -0,0 +1,67 @@
+import time
+
+from flask import Flask, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA_BIND = "replica"
+# Запити, які лише читають і можуть іти на репліку
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Ключ cookie-сесії: до цього часу читати з primary (після запису)
+STICKY_KEY = "db_primary_until"
+
+
+def _wants_replica() -> bool:
+    # Поза запитом (Celery, CLI) — завжди primary: задачі пишуть у БД
+    return has_request_context() and g.get("db_route") == REPLICA_BIND
+
+
+class RoutingSession(Session):
+    """Сесія, що спрямовує читання на репліку, а записи — на primary
+
+    Після першого flush сесія до кінця працює з primary, тому запит
+    бачить власні зміни (read-after-write).
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and not self.info.get("wrote")
+            and not getattr(clause, "is_dml", False)
+            and _wants_replica()
+        ):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_written(db_session, flush_context):
+    db_session.info["wrote"] = True
+
+
+def register_replica_routing(app: Flask) -> None:
+    """GET-запити читають з репліки, якщо її задано в DATABASE_REPLICA_URL
+
+    Після запиту, що змінив дані, клієнт ще DB_REPLICA_STICKY_SECONDS
+    читає з primary: репліка могла не встигнути отримати зміни.
+    """
+    if not app.config.get("DATABASE_REPLICA_URL"):
+        return
+    db_session = app.extensions["sqlalchemy"].session
+
+    @app.before_request
+    def choose_database():
+        sticky = session.get(STICKY_KEY, 0) > time.time()
+        if request.method in SAFE_METHODS and not sticky:
+            g.db_route = REPLICA_BIND
+
+    @app.after_request
+    def remember_write(response):
+        if db_session().info.get("wrote"):
+            session[STICKY_KEY] = (
+                time.time() + app.config["DB_REPLICA_STICKY_SECONDS"]
+            )
+        return response
@@ -0,0 +1,39 @@
+import time
+from typing import Dict, Optional
+
+import redis
+from flask import current_app
+
+# Кеш клієнтів за URL (redis-py тримає власний пул з'єднань)
+_clients: Dict[str, redis.Redis] = {}
+
+REDIS_SCHEMES = ("redis://", "rediss://", "unix://")
+
+# До цього моменту Redis вважається недоступним (не чекаємо таймаутів щоразу)
+_down_until = 0.0
+
+
+def get_redis() -> Optional[redis.Redis]:
+    """Отримати клієнт Redis або None, якщо Redis не налаштований чи недоступний"""
+    url = current_app.config.get("REDIS_URL")
+    if not url or not url.startswith(REDIS_SCHEMES):
+        return None  # напр. брокер Celery не Redis
+    if time.monotonic() < _down_until:
+        return None
+
+    client = _clients.get(url)
+    if client is None:
+        timeout = current_app.config.get("REDIS_SOCKET_TIMEOUT", 1)
+        client = redis.Redis.from_url(
+            url, socket_timeout=timeout, socket_connect_timeout=timeout
+        )
+        _clients[url] = client
+    return client
+
+
+def report_redis_error() -> None:
+    """Позначити Redis недоступним на REDIS_RETRY_INTERVAL секунд"""
+    global _down_until
+    _down_until = time.monotonic() + current_app.config.get(
+        "REDIS_RETRY_INTERVAL", 30
+    )
@@ -0,0 +1,213 @@
+import contextvars
+import functools
+import inspect
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import redis
+from flask import current_app
+
+from utils.redis_client import get_redis, report_redis_error
+
+logger = logging.getLogger(__name__)
+
+# Продовжити оренду, лише якщо замок досі наш (порівняння fencing token)
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Замок поточної задачі (для перевірки між етапами довгої роботи)
+_current_lock: contextvars.ContextVar[Optional["LeaseLock"]] = (
+    contextvars.ContextVar("current_lock", default=None)
+)
+
+
+class LeaseLost(Exception):
+    """Оренду замка втрачено: роботу вже виконує інший процес"""
+
+
+class LeaseLock:
+    """Замок з орендою та fencing token (Redis, з локальним запасним варіантом)
+
+    Token зростає з кожним захопленням. Захищені записи (завершення
+    DailyRun) порівнюють його зі збереженим і відкидають запис власника,
+    чию оренду вже перехопили.
+    """
+
+    KEY_PREFIX = "bdaygo:lock:"
+
+    # Локальний стан: назва -> (fencing token, кінець оренди)
+    _local: Dict[str, Tuple[int, float]] = {}
+    _local_fence = 0
+    _lock = threading.Lock()
+
+    def __init__(self, name: str, ttl: Optional[float] = None):
+        self.name = name
+        self.ttl = ttl or current_app.config["TASK_LOCK_TTL"]
+        self.token: Optional[int] = None  # fencing token поточного власника
+        self.lost = False
+        self._redis = get_redis()
+        self._app = current_app._get_current_object()  # для потоку продовження
+        self._stop = threading.Event()
+        self._renewer: Optional[threading.Thread] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.KEY_PREFIX}{self.name}"
+
+    def acquire(self) -> bool:
+        """Спробувати захопити замок (без очікування)"""
+        if self._redis is not None:
+            try:
+                # Монотонний лічильник: кожен новий власник має більший token
+                token = self._redis.incr(f"{self.key}:fence")
+                if self._redis.set(
+                    self.key, token, nx=True, px=int(self.ttl * 1000)
+                ):
+                    self.token = token
+                    return True
+                return False
+            except redis.RedisError:
+                report_redis_error()
+                self._redis = None
+
+        with self._lock:
+            now = time.monotonic()
+            held = self._local.get(self.name)
+            if held is not None and held[1] > now:
+                return False
+            LeaseLock._local_fence += 1
+            self.token = LeaseLock._local_fence
+            self._local[self.name] = (self.token, now + self.ttl)
+            return True
+
+    def renew(self) -> bool:
+        """Продовжити оренду; False — замок уже належить іншому власнику"""
+        if self._redis is not None:
+            try:
+                return bool(
+                    self._redis.eval(
+                        RENEW_SCRIPT,
+                        1,
+                        self.key,
+                        self.token,
+                        int(self.ttl * 1000),
+                    )
+                )
+            except redis.RedisError:
+                # Redis недоступний: не можемо перевірити, працюємо далі
+                report_redis_error()
+                return True
+
+        with self._lock:
+            held = self._local.get(self.name)
+            if held is None or held[0] != self.token:
+                return False
+            self._local[self.name] = (self.token, time.monotonic() + self.ttl)
+            return True
+
+    def release(self) -> None:
+        """Звільнити замок, якщо він досі наш"""
+        self._stop.set()
+        if self._renewer is not None:
+            self._renewer.join()
+
+        if self._redis is not None:
+            try:
+                self._redis.eval(RELEASE_SCRIPT, 1, self.key, self.token)
+            except redis.RedisError:
+                report_redis_error()
+            return
+
+        with self._lock:
+            held = self._local.get(self.name)
+            if held is not None and held[0] == self.token:
+                del self._local[self.name]
+
+    def start_renewal(self) -> None:
+        """Фоново продовжувати оренду кожну третину TTL (для довгих задач)"""
+
+        def renew_loop():
+            with self._app.app_context():
+                while not self._stop.wait(self.ttl / 3):
+                    if not self.renew():
+                        self.lost = True
+                        logger.warning("Втрачено оренду замка %s", self.name)
+                        return
+
+        self._renewer = threading.Thread(
+            target=renew_loop, name=f"lease-{self.name}", daemon=True
+        )
+        self._renewer.start()
+
+    def ensure_held(self) -> None:
+        """Перевірка між етапами роботи: не продовжувати без оренди"""
+        if self.lost:
+            raise LeaseLost(f"Оренду замка {self.name} втрачено")
+
+
+def current_fence() -> Optional[int]:
+    """Fencing token замка поточної задачі (None — задача без замка)"""
+    lock = _current_lock.get()
+    return lock.token if lock is not None else None
+
+
+def ensure_lease() -> None:
+    """Перервати роботу, якщо замок поточної задачі втрачено"""
+    lock = _current_lock.get()
+    if lock is not None:
+        lock.ensure_held()
+
+
+def singleton_task(name: str, ttl: Optional[float] = None) -> Callable:
+    """Декоратор задачі Celery: одночасно виконується лише одна копія
+
+    name може містити аргументи задачі: "retry-email:{employee_id}".
+    Замок створюється в контексті get_app(), а не в контексті,
+    який випадково відкритий у процесі воркера.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Відкладений імпорт: задачі імпортують цей модуль
+            from tasks.celery_tasks import get_app
+
+            lock_name = name.format(
+                **signature.bind(*args, **kwargs).arguments
+            )
+            with get_app().app_context():
+                lock = LeaseLock(lock_name, ttl)
+                if not lock.acquire():
+                    logger.info(
+                        "Задача %s вже виконується, пропускаємо", lock_name
+                    )
+                    return f"Задача {lock_name} вже виконується"
+
+                lock.start_renewal()
+                reset = _current_lock.set(lock)
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    _current_lock.reset(reset)
+                    lock.release()
+
+        # Celery перевіряє аргументи за сигнатурою задачі, а не wrapper
+        wrapper.__signature__ = signature
+        return wrapper
+
+    return decorator